@@ -1,23 +1,31 @@
-import json
 import time
 import os
+import queue
 import re
 import sqlite3
 import asyncio
+import atexit
+import base64
+import functools
+import hashlib
+import heapq
 import tempfile
 import shutil
-from contextlib import contextmanager
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Set, TypeVar
+from typing import Annotated, Any, Callable, Dict, List, Literal, Optional, Set, TypeVar
 from urllib.parse import unquote, urlparse
 
 import httpx
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+import orjson
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, StringConstraints
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -54,6 +62,13 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+# File mtimes and cache timestamps repeat across requests for unchanged
+# files, so the formatted string is memoised by timestamp.
+@functools.lru_cache(maxsize=1024)
+def iso_utc(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
 load_dotenv(DOTENV_PATH)
 
 DB_PATH = Path(os.getenv("KANBAN_DB_PATH", str(DEFAULT_DB_PATH))).expanduser().resolve()
@@ -84,16 +99,42 @@ API_BASE_URL = os.getenv("VITE_API_BASE_URL", "").strip().rstrip("/")
 if not API_BASE_URL:
     API_BASE_URL = f"http://localhost:{PORT}"
 FRONTEND_URL = os.getenv("FRONTEND_URL", "").strip().rstrip("/")
-CORS_ALLOW_ORIGINS = [FRONTEND_URL] if FRONTEND_URL else []
+# Starlette checks `origin in allow_origins`, so a frozenset keeps that a hash lookup.
+CORS_ALLOW_ORIGINS = frozenset([FRONTEND_URL] if FRONTEND_URL else [])
 CORS_ALLOW_METHODS = ["GET", "POST", "PATCH", "PUT", "DELETE"]
 CORS_ALLOW_HEADERS = ["Authorization", "Content-Type"]
 CORS_ALLOW_CREDENTIALS = True
 AGENT_CACHE_TTL_SECONDS = 60 * 60
+# Gateways without the batched history tool are re-probed this often.
+SESSIONS_HISTORY_BATCH_RETRY_SECONDS = 10 * 60
+SESSIONS_ACTIVITY_CACHE_TTL_SECONDS = 3.0
+SESSIONS_LIST_CACHE_TTL_SECONDS = 5.0
+SESSIONS_GET_RETRY_SECONDS = 10 * 60
+SESSION_COMMANDS_CACHE_TTL_SECONDS = 60.0
+SESSION_COMMANDS_CACHE_MAX_ENTRIES = 1024
 DEFAULT_WORKSPACE_ROOT = BASE_DIR.parent.parent
 WORKSPACE_ROOT = Path(os.getenv("WORKSPACE_BROWSER_ROOT", str(DEFAULT_WORKSPACE_ROOT))).expanduser().resolve()
 WORKSPACE_MAX_FILE_BYTES = int(os.getenv("WORKSPACE_MAX_FILE_BYTES", str(2 * 1024 * 1024)))
-WORKSPACE_SKIP_DIRS = {"node_modules", ".git", ".venv", "__pycache__"}
-WORKSPACE_IMAGE_SUFFIXES = {
+WORKSPACE_WRITE_CHUNK_CHARS = 1024 * 1024
+# Payloads up to this size are written in place unless the caller asks for an
+# atomic replace; larger ones always go through a temp file + os.replace.
+WORKSPACE_DIRECT_WRITE_MAX_BYTES = 64 * 1024
+WORKSPACE_RESOLVE_CACHE_TTL_SECONDS = 5.0
+WORKSPACE_RESOLVE_CACHE_MAX_ENTRIES = 4096
+workspace_resolve_cache: Dict[tuple[str, str], tuple[float, Path, Path]] = {}
+# Decoded text of recently opened files, keyed by (path, inode, mtime_ns, size)
+# so any rewrite misses; cleared wholesale once either bound is reached.
+WORKSPACE_TEXT_CACHE_MAX_ENTRIES = 64
+WORKSPACE_TEXT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+workspace_text_cache: Dict[tuple[str, int, int, int], str] = {}
+workspace_text_cache_state = {"bytes": 0}
+# A healthy workspace root is re-verified at most this often; failures are
+# always re-checked so the API recovers as soon as the root reappears.
+WORKSPACE_ROOT_CHECK_TTL_SECONDS = 30.0
+workspace_root_state = {"verified_until": 0.0}
+WORKSPACE_SKIP_DIRS = frozenset({"node_modules", ".git", ".venv", "__pycache__"})
+WORKSPACE_MARKDOWN_SUFFIXES = frozenset({".md", ".markdown", ".mdx"})
+WORKSPACE_IMAGE_SUFFIXES = frozenset({
     ".avif",
     ".bmp",
     ".gif",
@@ -105,7 +146,7 @@ WORKSPACE_IMAGE_SUFFIXES = {
     ".tif",
     ".tiff",
     ".webp",
-}
+})
 
 
 def is_path_within(path: Path, ancestor: Path) -> bool:
@@ -124,18 +165,37 @@ else:
     if DEFAULT_WORKSPACE_ROOT != WORKSPACE_ROOT:
         WORKSPACE_READ_ROOTS.append(DEFAULT_WORKSPACE_ROOT)
 
+# Both roots are fixed for the life of the process, so resolve and dedupe once.
+TASK_DOCS_ROOTS: tuple[Path, ...] = tuple(
+    dict.fromkeys(
+        [
+            (WORKSPACE_ROOT / "docs").resolve(),
+            (BASE_DIR / "docs").resolve(),
+        ]
+    )
+)
+
 STATUSES = ["Todo", "Plan", "In Progress", "Review", "Done"]
 PRIORITIES = ["Critical", "High", "Medium", "Low"]
-AUTOMATION_TRIGGER_STATUSES = {"Plan", "In Progress"}
+AUTOMATION_TRIGGER_STATUSES = frozenset({"Plan", "In Progress"})
+LIVE_SESSION_STATUSES = frozenset({"", "running", "active", "idle", "queued", "started"})
 SESSION_KEY_PATTERN = re.compile(r"(agent:[^`\s,]+)")
+SLUG_SEPARATOR_PATTERN = re.compile(r"[^a-z0-9]+")
+EXIT_CODE_PATTERN = re.compile(r"exited with code\s+(-?\d+)")
 ALLOWED_TRANSITIONS = {
-    "Plan": {"Todo", "In Progress", "Review", "Done"},
-    "Todo": {"Plan", "In Progress", "Review", "Done"},
-    "In Progress": {"Plan", "Todo", "Review", "Done"},
-    "Review": {"Plan", "Todo", "In Progress", "Done"},
-    "Done": {"Plan", "Todo", "Review"},
+    "Plan": frozenset({"Todo", "In Progress", "Review", "Done"}),
+    "Todo": frozenset({"Plan", "In Progress", "Review", "Done"}),
+    "In Progress": frozenset({"Plan", "Todo", "Review", "Done"}),
+    "Review": frozenset({"Plan", "Todo", "In Progress", "Done"}),
+    "Done": frozenset({"Plan", "Todo", "Review"}),
 }
-COMMAND_MONITOR_TOOL_NAMES = {
+STATUS_INDEX = {status: index for index, status in enumerate(STATUSES)}
+# One bitmask per source status: bit i is set when moving to STATUSES[i] is allowed.
+TRANSITION_MASKS = [
+    sum(1 << STATUS_INDEX[target] for target in ALLOWED_TRANSITIONS.get(status, ())) for status in STATUSES
+]
+# Both sets hold lower-cased names; lookups normalize once before probing.
+COMMAND_MONITOR_TOOL_NAMES = frozenset({
     "exec",
     "process",
     "bash",
@@ -143,38 +203,86 @@ COMMAND_MONITOR_TOOL_NAMES = {
     "exec_command",
     "run_command",
     "terminal",
-}
-COMMAND_MONITOR_TOOL_BLOCK_TYPES = {"tooluse", "tool_use", "toolcall", "tool_call"}
+})
+COMMAND_MONITOR_TOOL_BLOCK_TYPES = frozenset({"tooluse", "tool_use", "toolcall", "tool_call"})
+BROADCAST_SEND_TIMEOUT_SECONDS = 5.0
+WEBSOCKET_OUTBOX_SIZE = 256
 
 
 class ConnectionManager:
+    # Each client gets a bounded outbound queue drained by its own writer task,
+    # so publishers never wait on a slow socket. When a queue is full the
+    # oldest message is dropped: the frontend only uses messages as refetch
+    # triggers, so the newest ones are what matter.
     def __init__(self) -> None:
-        self.connections: Set[WebSocket] = set()
+        self.connections: Dict[WebSocket, "asyncio.Queue[str]"] = {}
+        self.writers: Dict[WebSocket, "asyncio.Task[None]"] = {}
 
     async def connect(self, websocket: WebSocket) -> None:
         await websocket.accept()
-        self.connections.add(websocket)
+        outbox: "asyncio.Queue[str]" = asyncio.Queue(maxsize=WEBSOCKET_OUTBOX_SIZE)
+        self.connections[websocket] = outbox
+        self.writers[websocket] = asyncio.create_task(self.write_loop(websocket, outbox))
 
     def disconnect(self, websocket: WebSocket) -> None:
-        self.connections.discard(websocket)
+        self.connections.pop(websocket, None)
+        writer = self.writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+
+    async def write_loop(self, websocket: WebSocket, outbox: "asyncio.Queue[str]") -> None:
+        try:
+            while True:
+                message = await outbox.get()
+                await asyncio.wait_for(websocket.send_text(message), timeout=BROADCAST_SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(websocket)
+            # A timed-out send may have been cut off mid-frame, and without a
+            # close the client never learns it was dropped. Closing ends the
+            # receive loop and makes the browser reconnect.
+            with suppress(Exception):
+                await asyncio.wait_for(websocket.close(code=1011), timeout=BROADCAST_SEND_TIMEOUT_SECONDS)
+
+    def enqueue(self, outbox: "asyncio.Queue[str]", message: str) -> None:
+        if outbox.full():
+            outbox.get_nowait()
+        outbox.put_nowait(message)
+
+    def send(self, websocket: WebSocket, message: str) -> None:
+        outbox = self.connections.get(websocket)
+        if outbox is not None:
+            self.enqueue(outbox, message)
 
     async def broadcast(self, payload: Dict[str, Any]) -> None:
-        dead: List[WebSocket] = []
-        for connection in self.connections:
-            try:
-                await connection.send_json(payload)
-            except Exception:
-                dead.append(connection)
-        for connection in dead:
-            self.disconnect(connection)
+        await self.broadcast_many([payload])
+
+    async def broadcast_many(self, payloads: List[Dict[str, Any]]) -> None:
+        # Clients refetch on every message, so they must not get an activity
+        # snapshot taken before the change they were told about.
+        sessions_activity_cache.clear()
+        if not self.connections or not payloads:
+            return
+        # Encode once for every client; frames stay text because the frontend
+        # JSON.parses event.data directly.
+        messages = [orjson.dumps(payload).decode("utf-8") for payload in payloads]
+        for outbox in self.connections.values():
+            for message in messages:
+                self.enqueue(outbox, message)
 
 
 manager = ConnectionManager()
-agent_cache_lock = asyncio.Lock()
 agent_cache: Dict[str, Any] = {
     "agents": None,
+    # Lower-cased agent id/name -> agent id, rebuilt with every refresh.
+    "index": {},
+    # Assignee options derived from the same directory, served by /api/config.
+    "assignees": None,
     "fetched_at": 0.0,
     "expires_at": 0.0,
+    # In-flight refresh shared by every caller that misses the cache.
+    "refresh_task": None,
 }
 
 WRITE_RETRY_ATTEMPTS = 5
@@ -199,24 +307,147 @@ def execute_write(conn: sqlite3.Connection, query: str, params: tuple[Any, ...]
     return run_with_write_retry(lambda: conn.execute(query, params))
 
 
+def update_ticket_returning(
+    conn: sqlite3.Connection, ticket_id: int, assignments: str, params: tuple[Any, ...]
+) -> Dict[str, Any]:
+    # RETURNING hands back the updated row, so no follow-up SELECT is needed.
+    # fetchall() drains the statement so it does not stay open until commit.
+    rows = execute_write(
+        conn,
+        f"UPDATE tickets SET {assignments} WHERE id = ? RETURNING {TICKET_COLUMNS}",
+        (*params, ticket_id),
+    ).fetchall()
+    return ticket_row(rows[0])
+
+
+# Ticket writes from async handlers run on one dedicated thread so the event loop
+# never blocks on SQLite (or fsync), and writers queue here instead of
+# contending for the database lock.
+db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kanban-db-writer")
+
+
+async def run_db_write(action: Callable[[], T]) -> T:
+    return await asyncio.get_running_loop().run_in_executor(db_writer, action)
+
+
+def begin_write(conn: sqlite3.Connection) -> None:
+    # Pooled connections run in autocommit mode. Taking the write lock up front
+    # groups a handler's writes into one commit and avoids read->write lock
+    # upgrades failing with SQLITE_BUSY under concurrent writers.
+    run_with_write_retry(lambda: conn.execute("BEGIN IMMEDIATE"))
+
+
 def commit_write(conn: sqlite3.Connection) -> None:
     run_with_write_retry(conn.commit)
 
 
+DB_POOL_SIZE = max(1, int(os.getenv("KANBAN_DB_POOL_SIZE", str(min(8, (os.cpu_count() or 1) * 2)))))
+# sqlite3 keeps a per-connection LRU of prepared statements keyed by SQL text;
+# the hot statements below are shared constants so every call hits that cache.
+DB_CACHED_STATEMENTS = 256
+TICKET_COLUMNS = "id, title, description, status, assignee, priority, agent_session_key, archived_at, created_at, updated_at"
+EVENT_COLUMNS = "id, ticket_id, event_type, actor, details, created_at"
+COMMENT_COLUMNS = "id, ticket_id, author, content, created_at"
+SQL_SELECT_TICKET_BY_ID = f"SELECT {TICKET_COLUMNS} FROM tickets WHERE id = ?"
+SQL_TICKET_EXISTS = "SELECT id FROM tickets WHERE id = ?"
+SQL_SELECT_COMMENTS_BY_TICKET = f"SELECT {COMMENT_COLUMNS} FROM ticket_comments WHERE ticket_id = ? ORDER BY created_at ASC"
+SQL_SELECT_EVENTS_BY_TICKET = f"SELECT {EVENT_COLUMNS} FROM ticket_events WHERE ticket_id = ? ORDER BY created_at DESC"
+# The key list is bound as one JSON array so the statement text never changes
+# (one cached plan, no host-parameter limit) however many sessions are listed.
+SQL_SELECT_TICKETS_BY_SESSION_KEYS = (
+    "SELECT id, title, status, assignee, agent_session_key FROM tickets "
+    "WHERE agent_session_key IN (SELECT value FROM json_each(?)) ORDER BY id DESC"
+)
+SQL_INSERT_TICKET = (
+    "INSERT INTO tickets (title, description, status, assignee, priority, archived_at, created_at, updated_at) "
+    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?) RETURNING {TICKET_COLUMNS}"
+)
+SQL_INSERT_EVENT = "INSERT INTO ticket_events (ticket_id, event_type, actor, details, created_at) VALUES (?, ?, ?, ?, ?)"
+SQL_INSERT_COMMENT = "INSERT INTO ticket_comments (ticket_id, author, content, created_at) VALUES (?, ?, ?, ?)"
+DB_CONNECTION_PRAGMAS = (
+    # page_size only takes effect on a brand-new database file, so it has to run
+    # before journal_mode=WAL writes the header; on existing files it is a no-op.
+    "PRAGMA page_size=8192",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+# Handlers run both in the threadpool and on the event loop, so acquiring never
+# blocks: an empty pool opens an extra connection, and extras are closed on release.
+class ConnectionPool:
+    def __init__(self, path: Path, size: int) -> None:
+        self.path = path
+        self.idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+
+    def open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=30.0,
+            check_same_thread=False,
+            cached_statements=DB_CACHED_STATEMENTS,
+            isolation_level=None,
+        )
+        for pragma in DB_CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def fill(self) -> None:
+        while not self.idle.full():
+            try:
+                self.idle.put_nowait(self.open_connection())
+            except queue.Full:
+                break
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self.open_connection()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+db_pool = ConnectionPool(DB_PATH, DB_POOL_SIZE)
+# Shutdown hooks do not run when the module is used outside the ASGI lifespan.
+atexit.register(db_pool.close_all)
+
+
 @contextmanager
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, timeout=30.0)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA busy_timeout=30000")
+    conn = db_pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        db_pool.release(conn)
 
 
 def init_db() -> None:
     with get_db() as conn:
+        begin_write(conn)
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS tickets (
@@ -258,20 +489,76 @@ def init_db() -> None:
             )
             """
         )
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status)")
+        ticket_columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(tickets)")}
+        if "priority_rank" not in ticket_columns:
+            # Board order by priority; a virtual generated column so the sort
+            # can be served by an index instead of a CASE evaluated per row.
+            conn.execute(
+                "ALTER TABLE tickets ADD COLUMN priority_rank INTEGER GENERATED ALWAYS AS ("
+                "CASE priority WHEN 'Critical' THEN 1 WHEN 'High' THEN 2 WHEN 'Medium' THEN 3 ELSE 4 END"
+                ") VIRTUAL"
+            )
+        # Board columns filter live tickets by status; the partial index also
+        # covers the priority ordering so the column query needs no sort.
+        conn.execute("DROP INDEX IF EXISTS idx_tickets_status")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tickets_board "
+            "ON tickets(status, priority_rank, updated_at DESC) WHERE archived_at IS NULL"
+        )
         conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_updated_at ON tickets(updated_at DESC)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_archived_at ON tickets(archived_at)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_ticket_id ON ticket_events(ticket_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_created_at ON ticket_events(created_at DESC)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_ticket_id ON ticket_comments(ticket_id)")
+        conn.execute("DROP INDEX IF EXISTS idx_tickets_archived_at")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tickets_archived_rank "
+            "ON tickets(archived_at, priority_rank, updated_at DESC)"
+        )
+        # The archive view orders by archived_at DESC, updated_at DESC; a partial
+        # index in exactly that order serves it without a sort.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tickets_archived_recent "
+            "ON tickets(archived_at DESC, updated_at DESC) WHERE archived_at IS NOT NULL"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_assignee ON tickets(assignee, archived_at)")
+        # Session activity maps live session keys back to tickets; most tickets
+        # have no session, so the partial index stays small.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tickets_agent_session_key "
+            "ON tickets(agent_session_key, id DESC) WHERE agent_session_key IS NOT NULL"
+        )
+        # (created_at, id) is the activity feed's keyset cursor.
+        conn.execute("DROP INDEX IF EXISTS idx_events_created_at")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_created_id ON ticket_events(created_at DESC, id DESC)")
+        # Per-ticket timelines filter on ticket_id and order by created_at; the
+        # composite indexes serve both without a sort and supersede the
+        # single-column ticket_id indexes. The event indexes carry id DESC so
+        # filtered activity pages match the feed's (created_at, id) order too.
+        conn.execute("DROP INDEX IF EXISTS idx_events_ticket_id")
+        conn.execute("DROP INDEX IF EXISTS idx_comments_ticket_id")
+        conn.execute("DROP INDEX IF EXISTS idx_events_ticket_time")
+        conn.execute("DROP INDEX IF EXISTS idx_events_type_time")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_events_ticket_time_id "
+            "ON ticket_events(ticket_id, created_at DESC, id DESC)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_ticket_time ON ticket_comments(ticket_id, created_at)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_events_type_time_id "
+            "ON ticket_events(event_type, created_at DESC, id DESC)"
+        )
         conn.commit()
+        conn.execute("ANALYZE")
+
+        # journal_mode=WAL silently stays on the rollback journal on filesystems
+        # without shared-memory support (some network/FUSE mounts).
+        journal_mode = str(conn.execute("PRAGMA journal_mode").fetchone()[0]).lower()
+        if journal_mode != "wal":
+            print(f"SQLite database {DB_PATH} is using journal_mode={journal_mode}, not WAL; writes will block readers")
 
 
 def create_event(conn: sqlite3.Connection, ticket_id: int, event_type: str, actor: str, details: str) -> Dict[str, Any]:
     ts = now_iso()
     cursor = execute_write(
         conn,
-        "INSERT INTO ticket_events (ticket_id, event_type, actor, details, created_at) VALUES (?, ?, ?, ?, ?)",
+        SQL_INSERT_EVENT,
         (ticket_id, event_type, actor, details, ts),
     )
     return {
@@ -284,11 +571,44 @@ def create_event(conn: sqlite3.Connection, ticket_id: int, event_type: str, acto
     }
 
 
+@functools.lru_cache(maxsize=8)
+def insert_events_returning_sql(count: int) -> str:
+    values = ", ".join(["(?, ?, ?, ?, ?)"] * count)
+    return f"INSERT INTO ticket_events (ticket_id, event_type, actor, details, created_at) VALUES {values} RETURNING id"
+
+
+def create_events(conn: sqlite3.Connection, rows: List[tuple[int, str, str, str]]) -> List[Dict[str, Any]]:
+    if not rows:
+        return []
+
+    ts = now_iso()
+    params: List[Any] = []
+    for ticket_id, event_type, actor, details in rows:
+        params.extend((ticket_id, event_type, actor, details, ts))
+    # One multi-row INSERT ... RETURNING instead of executemany() plus a
+    # last_insert_rowid() query. RETURNING order is unspecified, but
+    # AUTOINCREMENT ids ascend in VALUES order, so sorting restores it.
+    event_ids = sorted(
+        row[0] for row in execute_write(conn, insert_events_returning_sql(len(rows)), tuple(params)).fetchall()
+    )
+    return [
+        {
+            "id": event_id,
+            "ticket_id": ticket_id,
+            "event_type": event_type,
+            "actor": actor,
+            "details": details,
+            "created_at": ts,
+        }
+        for event_id, (ticket_id, event_type, actor, details) in zip(event_ids, rows)
+    ]
+
+
 def create_comment(conn: sqlite3.Connection, ticket_id: int, author: str, content: str) -> Dict[str, Any]:
     ts = now_iso()
     cursor = execute_write(
         conn,
-        "INSERT INTO ticket_comments (ticket_id, author, content, created_at) VALUES (?, ?, ?, ?)",
+        SQL_INSERT_COMMENT,
         (ticket_id, author, content, ts),
     )
     return {
@@ -300,13 +620,54 @@ def create_comment(conn: sqlite3.Connection, ticket_id: int, author: str, conten
     }
 
 
-def row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
-    return dict(row)
+# Rows come back as plain tuples; the adapters below map the fixed column lists
+# above positionally, so those SELECTs must keep their column order.
+def ticket_row(row: tuple[Any, ...]) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "title": row[1],
+        "description": row[2],
+        "status": row[3],
+        "assignee": row[4],
+        "priority": row[5],
+        "agent_session_key": row[6],
+        "archived_at": row[7],
+        "created_at": row[8],
+        "updated_at": row[9],
+    }
+
+
+def event_row(row: tuple[Any, ...]) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "ticket_id": row[1],
+        "event_type": row[2],
+        "actor": row[3],
+        "details": row[4],
+        "created_at": row[5],
+    }
+
+
+def comment_row(row: tuple[Any, ...]) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "ticket_id": row[1],
+        "author": row[2],
+        "content": row[3],
+        "created_at": row[4],
+    }
+
+
+def cursor_dicts(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
 
 
 def normalize_workspace_relative_path(path_value: str) -> str:
     raw = path_value.strip()
     for _ in range(2):
+        if "%" not in raw:
+            break
         decoded = unquote(raw)
         if decoded == raw:
             break
@@ -334,6 +695,39 @@ def resolve_workspace_path(path_value: str) -> Path:
 
 
 def resolve_workspace_path_for_read(path_value: str, expected_kind: str = "any") -> tuple[Path, Path]:
+    # Only successful lookups in the first read root are cached: nothing can
+    # shadow them, and files created outside the API show up immediately. A
+    # hit is re-checked with one stat because agents also delete and replace
+    # workspace files; the workspace write endpoints clear the cache.
+    cache_key = (path_value, expected_kind)
+    now = time.monotonic()
+    cached = workspace_resolve_cache.get(cache_key)
+    if cached is not None:
+        if cached[0] > now and workspace_path_matches_kind(cached[1], expected_kind):
+            return cached[1], cached[2]
+        workspace_resolve_cache.pop(cache_key, None)
+
+    candidate, root = resolve_workspace_path_for_read_uncached(path_value, expected_kind)
+    if root == WORKSPACE_READ_ROOTS[0]:
+        if len(workspace_resolve_cache) >= WORKSPACE_RESOLVE_CACHE_MAX_ENTRIES:
+            workspace_resolve_cache.clear()
+        workspace_resolve_cache[cache_key] = (now + WORKSPACE_RESOLVE_CACHE_TTL_SECONDS, candidate, root)
+    return candidate, root
+
+
+def workspace_path_matches_kind(path: Path, expected_kind: str) -> bool:
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return False
+    if expected_kind == "file":
+        return stat.S_ISREG(mode)
+    if expected_kind == "dir":
+        return stat.S_ISDIR(mode)
+    return True
+
+
+def resolve_workspace_path_for_read_uncached(path_value: str, expected_kind: str = "any") -> tuple[Path, Path]:
     last_candidate: Optional[Path] = None
     for root in WORKSPACE_READ_ROOTS:
         candidate = resolve_under_workspace_root(path_value, root)
@@ -368,33 +762,18 @@ def workspace_relative_or_string(path: Path, root: Path = WORKSPACE_ROOT) -> str
         return str(path)
 
 
-def is_markdown_file(path: Path) -> bool:
-    return path.suffix.lower() in {".md", ".markdown", ".mdx"}
-
-
 def is_image_file(path: Path) -> bool:
     return path.suffix.lower() in WORKSPACE_IMAGE_SUFFIXES
 
 
+@functools.lru_cache(maxsize=2048)
 def slugify_ticket_title(title: str) -> str:
-    normalized = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+    normalized = SLUG_SEPARATOR_PATTERN.sub("-", title.lower()).strip("-")
     return normalized or "untitled"
 
 
-def task_docs_roots() -> List[Path]:
-    roots = [
-        (WORKSPACE_ROOT / "docs").resolve(),
-        (BASE_DIR / "docs").resolve(),
-    ]
-    deduped: List[Path] = []
-    seen: Set[str] = set()
-    for root in roots:
-        key = str(root)
-        if key in seen:
-            continue
-        seen.add(key)
-        deduped.append(root)
-    return deduped
+def task_docs_roots() -> tuple[Path, ...]:
+    return TASK_DOCS_ROOTS
 
 
 def expected_task_docs_dir_for_root(root: Path, ticket_id: int, title: str) -> Path:
@@ -406,202 +785,249 @@ def default_task_docs_dir(ticket_id: int, title: str) -> Path:
     return expected_task_docs_dir_for_root(root, ticket_id, title)
 
 
+TASK_DOCS_DIR_CACHE_TTL_SECONDS = 30.0
+task_docs_dir_cache: Dict[int, tuple[float, Path]] = {}
+task_docs_missing_cache: Dict[int, tuple[float, tuple[int, ...]]] = {}
+
+
+def task_docs_roots_signature(roots: tuple[Path, ...]) -> tuple[int, ...]:
+    signature: List[int] = []
+    for root in roots:
+        try:
+            signature.append(os.stat(root).st_mtime_ns)
+        except OSError:
+            signature.append(-1)
+    return tuple(signature)
+
+
 def find_task_docs_dir(ticket_id: int, preferred_title: Optional[str] = None) -> Optional[Path]:
     roots = task_docs_roots()
 
+    # A miss stays valid while no root directory has changed: creating a
+    # task folder anywhere bumps its root's mtime, so one stat per root
+    # replaces the probes and scans below.
+    missing = task_docs_missing_cache.get(ticket_id)
+    if missing is not None:
+        if (
+            time.monotonic() - missing[0] < TASK_DOCS_DIR_CACHE_TTL_SECONDS
+            and missing[1] == task_docs_roots_signature(roots)
+        ):
+            return None
+        task_docs_missing_cache.pop(ticket_id, None)
+
     if preferred_title:
         for root in roots:
             preferred = expected_task_docs_dir_for_root(root, ticket_id, preferred_title)
-            if preferred.exists() and preferred.is_dir():
+            if preferred.is_dir():
                 return preferred
 
+    # Fallback scans are cached per ticket; a hit is re-validated with one stat
+    # so renamed or removed folders fall through to a fresh scan.
+    cached = task_docs_dir_cache.get(ticket_id)
+    if cached is not None and time.monotonic() - cached[0] < TASK_DOCS_DIR_CACHE_TTL_SECONDS and cached[1].is_dir():
+        return cached[1]
+
+    # Taken before scanning so a folder created mid-scan invalidates the miss.
+    signature = task_docs_roots_signature(roots)
     prefix = f"task-{ticket_id}-"
-    matches: List[Path] = []
-    for root in roots:
-        if not root.exists() or not root.is_dir():
+    matches: List[tuple[str, int, str]] = []
+    for root_index, root in enumerate(roots):
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.name.startswith(prefix) and entry.is_dir():
+                        matches.append((entry.name.lower(), root_index, entry.path))
+        except (FileNotFoundError, NotADirectoryError):
             continue
-        matches.extend([entry for entry in root.iterdir() if entry.is_dir() and entry.name.startswith(prefix)])
 
     if not matches:
+        task_docs_dir_cache.pop(ticket_id, None)
+        task_docs_missing_cache[ticket_id] = (time.monotonic(), signature)
         return None
-    matches.sort(key=lambda entry: entry.name.lower())
-    return matches[0]
+    found = Path(min(matches)[2])
+    task_docs_dir_cache[ticket_id] = (time.monotonic(), found)
+    return found
 
 
 def list_task_docs_files(folder: Path) -> List[Dict[str, Any]]:
+    found: List[tuple[str, os.DirEntry[str]]] = []
+    stack: List[tuple[str, str]] = [(str(folder), "")]
+    while stack:
+        directory, relative_dir = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative_path = f"{relative_dir}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in WORKSPACE_SKIP_DIRS:
+                        stack.append((entry.path, f"{relative_path}/"))
+                    continue
+                if entry.is_file():
+                    found.append((relative_path, entry))
+
+    if not found:
+        return []
+
+    folder_path = workspace_relative(folder)
+    found.sort(key=lambda item: item[0].lower())
     files: List[Dict[str, Any]] = []
-    for file_path in sorted(folder.rglob("*"), key=lambda path: str(path).lower()):
-        if not file_path.is_file():
-            continue
-        stats = file_path.stat()
+    for relative_path, entry in found:
+        stats = entry.stat()
+        suffix = os.path.splitext(entry.name)[1].lower()
         files.append(
             {
-                "name": file_path.name,
-                "path": workspace_relative(file_path),
-                "relativePath": str(file_path.relative_to(folder)).replace("\\", "/"),
+                "name": entry.name,
+                "path": f"{folder_path}/{relative_path}" if folder_path != "." else relative_path,
+                "relativePath": relative_path,
                 "sizeBytes": stats.st_size,
-                "updatedAt": datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc).isoformat(),
-                "isMarkdown": is_markdown_file(file_path),
-                "isImage": is_image_file(file_path),
+                "updatedAt": iso_utc(stats.st_mtime),
+                "isMarkdown": suffix in WORKSPACE_MARKDOWN_SUFFIXES,
+                "isImage": suffix in WORKSPACE_IMAGE_SUFFIXES,
             }
         )
     return files
 
 
-def workspace_entry(path: Path, root: Path = WORKSPACE_ROOT) -> Dict[str, Any]:
-    stats = path.stat()
-    kind = "dir" if path.is_dir() else "file"
+def workspace_entry(entry: os.DirEntry, rel_dir: str) -> Dict[str, Any]:
+    # One stat (following symlinks, as before) gives type, size and mtime; the
+    # path is built from the listed directory instead of relative_to().
+    stats = entry.stat()
+    kind = "dir" if stat.S_ISDIR(stats.st_mode) else "file"
+    suffix = os.path.splitext(entry.name)[1].lower()
     return {
-        "name": path.name,
-        "path": workspace_relative(path, root=root),
+        "name": entry.name,
+        "path": f"{rel_dir}/{entry.name}" if rel_dir else entry.name,
         "type": kind,
         "sizeBytes": stats.st_size if kind == "file" else None,
-        "updatedAt": datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc).isoformat(),
-        "isMarkdown": is_markdown_file(path) if kind == "file" else False,
-        "isImage": is_image_file(path) if kind == "file" else False,
+        "updatedAt": iso_utc(stats.st_mtime),
+        "isMarkdown": suffix in WORKSPACE_MARKDOWN_SUFFIXES if kind == "file" else False,
+        "isImage": suffix in WORKSPACE_IMAGE_SUFFIXES if kind == "file" else False,
     }
 
 
+# Field constraints are enforced by pydantic-core, so request validation never
+# drops into Python-level validators.
+TicketTitle = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=200)]
+TicketDescription = Annotated[str, StringConstraints(max_length=10000)]
+TicketPriority = Literal["Critical", "High", "Medium", "Low"]
+CommentAuthor = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=100)]
+CommentContent = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=10000)]
+WorkspaceRelativePath = Annotated[
+    str, StringConstraints(strip_whitespace=True, min_length=1, max_length=1024, pattern=r"^[^/]")
+]
+
+
 class TicketCreate(BaseModel):
-    title: str
-    description: str = ""
-    assignee: str = "Unassigned"
-    priority: str = "Medium"
+    model_config = ConfigDict(frozen=True)
 
-    @field_validator("title")
-    @classmethod
-    def validate_title(cls, value: str) -> str:
-        text = value.strip()
-        if not text:
-            raise ValueError("title is required")
-        if len(text) > 200:
-            raise ValueError("title too long")
-        return text
-
-    @field_validator("description")
-    @classmethod
-    def validate_description(cls, value: str) -> str:
-        if len(value) > 10000:
-            raise ValueError("description too long")
-        return value
-
-    @field_validator("priority")
-    @classmethod
-    def validate_priority(cls, value: str) -> str:
-        if value not in PRIORITIES:
-            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
-        return value
+    title: TicketTitle
+    description: TicketDescription = ""
+    assignee: str = "Unassigned"
+    priority: TicketPriority = "Medium"
 
 
 class TicketUpdate(BaseModel):
-    title: Optional[str] = None
-    description: Optional[str] = None
-    assignee: Optional[str] = None
-    priority: Optional[str] = None
+    model_config = ConfigDict(frozen=True)
 
-    @field_validator("title")
-    @classmethod
-    def validate_title(cls, value: Optional[str]) -> Optional[str]:
-        if value is None:
-            return value
-        text = value.strip()
-        if not text:
-            raise ValueError("title cannot be empty")
-        if len(text) > 200:
-            raise ValueError("title too long")
-        return text
-
-    @field_validator("description")
-    @classmethod
-    def validate_description(cls, value: Optional[str]) -> Optional[str]:
-        if value is None:
-            return value
-        if len(value) > 10000:
-            raise ValueError("description too long")
-        return value
-
-    @field_validator("priority")
-    @classmethod
-    def validate_priority(cls, value: Optional[str]) -> Optional[str]:
-        if value is None:
-            return value
-        if value not in PRIORITIES:
-            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
-        return value
+    title: Optional[TicketTitle] = None
+    description: Optional[TicketDescription] = None
+    assignee: Optional[str] = None
+    priority: Optional[TicketPriority] = None
 
 
 class CommentCreate(BaseModel):
-    author: str
-    content: str
+    model_config = ConfigDict(frozen=True)
 
-    @field_validator("author")
-    @classmethod
-    def validate_author(cls, value: str) -> str:
-        text = value.strip()
-        if not text:
-            raise ValueError("author is required")
-        if len(text) > 100:
-            raise ValueError("author too long")
-        return text
-
-    @field_validator("content")
-    @classmethod
-    def validate_content(cls, value: str) -> str:
-        text = value.strip()
-        if not text:
-            raise ValueError("content is required")
-        if len(text) > 10000:
-            raise ValueError("content too long")
-        return text
+    author: CommentAuthor
+    content: CommentContent
 
 
 class WorkspaceFileUpdate(BaseModel):
-    path: str
-    content: str
+    model_config = ConfigDict(frozen=True)
 
-    @field_validator("path")
-    @classmethod
-    def validate_path(cls, value: str) -> str:
-        text = value.strip()
-        if not text:
-            raise ValueError("path is required")
-        if len(text) > 1024:
-            raise ValueError("path too long")
-        if text.startswith("/"):
-            raise ValueError("path must be workspace-relative")
-        return text
+    path: WorkspaceRelativePath
+    content: str
 
 
 class WorkspaceFileCreate(BaseModel):
-    path: str
+    model_config = ConfigDict(frozen=True)
+
+    path: WorkspaceRelativePath
     content: str = ""
 
-    @field_validator("path")
-    @classmethod
-    def validate_path(cls, value: str) -> str:
-        text = value.strip()
-        if not text:
-            raise ValueError("path is required")
-        if len(text) > 1024:
-            raise ValueError("path too long")
-        if text.startswith("/"):
-            raise ValueError("path must be workspace-relative")
-        return text
+
+# Typed responses let FastAPI serialize through pydantic-core instead of
+# validating an untyped dict.
+class WorkspaceFileContent(BaseModel):
+    root: str
+    path: str
+    name: str
+    content: str
+    isMarkdown: bool
+    isImage: bool
+    sizeBytes: int
+    updatedAt: str
 
 
-app = FastAPI(title="OpenClaw Kanban", version="1.0.0")
+class WorkspaceFileWritten(BaseModel):
+    ok: bool = True
+    root: str
+    path: str
+    name: str
+    isMarkdown: bool
+    isImage: bool
+    sizeBytes: int
+    updatedAt: str
+
+
+# List endpoints return this directly: FastAPI then skips validating the
+# payload against the return annotation, and orjson serializes the rows
+# natively.
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+app = FastAPI(title="OpenClaw Kanban", version="1.0.0", default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ALLOW_ORIGINS,
     allow_credentials=CORS_ALLOW_CREDENTIALS,
     allow_methods=CORS_ALLOW_METHODS,
     allow_headers=CORS_ALLOW_HEADERS,
+    expose_headers=["X-Next-Cursor", "X-Has-More"],
 )
 
 if FRONTEND_DIST_DIR.exists():
     app.mount("/static", StaticFiles(directory=FRONTEND_DIST_DIR), name="static")
 
 
+gateway_http: Dict[str, Optional[httpx.AsyncClient]] = {"client": None}
+sessions_history_batch_state = {"retry_at": 0.0}
+# (session_limit, history_limit) -> (expires_at, build task); the expiry is
+# set once the build finishes and failures are never kept.
+sessions_activity_cache: Dict[tuple[int, int], tuple[float, "asyncio.Task[Dict[str, Any]]"]] = {}
+# Liveness checks for a batch of pickups share one sessions_list fetch.
+sessions_list_cache: Dict[str, Any] = {"expires_at": 0.0, "task": None}
+sessions_list_shape_state = {"index": 0}
+sessions_get_state = {"retry_at": 0.0}
+# (session key, history limit) -> (session updatedAt ms, stored at, commands).
+# A session whose updatedAt hasn't moved has no new history to fetch.
+session_commands_cache: Dict[tuple[str, int], tuple[int, float, List[Dict[str, Any]]]] = {}
+
+
+def get_gateway_client() -> httpx.AsyncClient:
+    # One keep-alive pool for every gateway call instead of a new client (and
+    # TCP/TLS handshake) per request; closed on shutdown.
+    client = gateway_http["client"]
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        )
+        gateway_http["client"] = client
+    return client
+
+
 async def call_openclaw_tool(
     tool: str,
     args: Dict[str, Any],
@@ -620,12 +1046,12 @@ async def call_openclaw_tool(
         payload["sessionKey"] = invoke_session_key.strip()
 
     try:
-        async with httpx.AsyncClient(timeout=timeout_seconds) as client:
-            response = await client.post(
-                f"{OPENCLAW_GATEWAY_URL}/tools/invoke",
-                json=payload,
-                headers=headers,
-            )
+        response = await get_gateway_client().post(
+            f"{OPENCLAW_GATEWAY_URL}/tools/invoke",
+            json=payload,
+            headers=headers,
+            timeout=timeout_seconds,
+        )
     except httpx.HTTPError as exc:
         raise HTTPException(status_code=502, detail=f"Gateway request failed: {exc}") from exc
 
@@ -634,8 +1060,8 @@ async def call_openclaw_tool(
         raise HTTPException(status_code=502, detail=f"Gateway error: {detail}")
 
     try:
-        body = response.json()
-    except json.JSONDecodeError as exc:
+        body = orjson.loads(response.content)
+    except orjson.JSONDecodeError as exc:
         raise HTTPException(status_code=502, detail="Gateway returned invalid JSON") from exc
 
     if not body.get("ok"):
@@ -691,8 +1117,8 @@ def parse_agents_list_response(response: Dict[str, Any]) -> List[Dict[str, Any]]
             if not isinstance(text, str):
                 continue
             try:
-                parsed = json.loads(text)
-            except json.JSONDecodeError:
+                parsed = orjson.loads(text)
+            except orjson.JSONDecodeError:
                 continue
             if isinstance(parsed, dict) and "agents" in parsed:
                 return normalize_agent_records(parsed.get("agents"))
@@ -705,62 +1131,81 @@ async def fetch_gateway_agents_uncached() -> List[Dict[str, Any]]:
     return parse_agents_list_response(response)
 
 
+async def refresh_gateway_agents() -> List[Dict[str, Any]]:
+    agents = await fetch_gateway_agents_uncached()
+    # A cache clear while this fetch was in flight detaches it, and the
+    # directory it fetched must not repopulate the cache.
+    if agent_cache.get("refresh_task") is not asyncio.current_task():
+        return agents
+    fetched_at = time.time()
+    agent_cache["agents"] = agents
+    agent_cache["index"] = build_agent_directory_index(agents)
+    agent_cache["assignees"] = assignee_options_from_agents(agents)
+    agent_cache["fetched_at"] = fetched_at
+    agent_cache["expires_at"] = fetched_at + AGENT_CACHE_TTL_SECONDS
+    return agents
+
+
+def agent_cache_snapshot(cached: bool, stale: bool) -> Dict[str, Any]:
+    return {
+        "agents": agent_cache.get("agents"),
+        "index": agent_cache.get("index") or {},
+        "assignees": agent_cache.get("assignees") or fallback_assignee_options(),
+        "fetched_at": float(agent_cache.get("fetched_at", 0.0) or 0.0),
+        "expires_at": float(agent_cache.get("expires_at", 0.0) or 0.0),
+        "cached": cached,
+        "stale": stale,
+    }
+
+
+def start_agent_cache_refresh() -> "asyncio.Task[List[Dict[str, Any]]]":
+    refresh_task = agent_cache.get("refresh_task")
+    if refresh_task is None or refresh_task.done():
+        refresh_task = asyncio.create_task(refresh_gateway_agents())
+        # Background refreshes may finish with nobody awaiting them; retrieve
+        # the exception so it is not reported as unhandled.
+        refresh_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        agent_cache["refresh_task"] = refresh_task
+    return refresh_task
+
+
 async def get_cached_gateway_agents(force_refresh: bool = False) -> Dict[str, Any]:
-    now = time.time()
     cached_agents = agent_cache.get("agents")
     expires_at = float(agent_cache.get("expires_at", 0.0) or 0.0)
-    if not force_refresh and cached_agents is not None and now < expires_at:
-        return {
-            "agents": cached_agents,
-            "fetched_at": float(agent_cache.get("fetched_at", 0.0) or 0.0),
-            "expires_at": expires_at,
-            "cached": True,
-            "stale": False,
-        }
-
-    async with agent_cache_lock:
-        now = time.time()
-        cached_agents = agent_cache.get("agents")
-        expires_at = float(agent_cache.get("expires_at", 0.0) or 0.0)
-        if not force_refresh and cached_agents is not None and now < expires_at:
-            return {
-                "agents": cached_agents,
-                "fetched_at": float(agent_cache.get("fetched_at", 0.0) or 0.0),
-                "expires_at": expires_at,
-                "cached": True,
-                "stale": False,
-            }
+    if not force_refresh and cached_agents is not None:
+        if time.time() < expires_at:
+            return agent_cache_snapshot(cached=True, stale=False)
+        # Stale-while-revalidate: serve the expired directory right away and
+        # refresh it in the background.
+        start_agent_cache_refresh()
+        return agent_cache_snapshot(cached=True, stale=True)
 
-        try:
-            agents = await fetch_gateway_agents_uncached()
-        except HTTPException:
-            if cached_agents is not None:
-                return {
-                    "agents": cached_agents,
-                    "fetched_at": float(agent_cache.get("fetched_at", 0.0) or 0.0),
-                    "expires_at": expires_at,
-                    "cached": True,
-                    "stale": True,
-                }
-            raise
+    refresh_task = start_agent_cache_refresh()
 
-        fetched_at = time.time()
-        next_expiry = fetched_at + AGENT_CACHE_TTL_SECONDS
-        agent_cache["agents"] = agents
-        agent_cache["fetched_at"] = fetched_at
-        agent_cache["expires_at"] = next_expiry
+    try:
+        # Shield so one cancelled caller does not abort the refresh for the others.
+        agents = await asyncio.shield(refresh_task)
+    except HTTPException:
+        if cached_agents is not None:
+            return agent_cache_snapshot(cached=True, stale=True)
+        raise
 
+    if agent_cache.get("refresh_task") is not refresh_task:
+        # Detached by a cache clear: answer from this fetch without caching it.
         return {
+            **agent_cache_snapshot(cached=False, stale=False),
             "agents": agents,
-            "fetched_at": fetched_at,
-            "expires_at": next_expiry,
-            "cached": False,
-            "stale": False,
+            "index": build_agent_directory_index(agents),
+            "assignees": assignee_options_from_agents(agents),
         }
+    return agent_cache_snapshot(cached=False, stale=False)
+
+
+FALLBACK_ASSIGNEE_OPTIONS = ["Unassigned"]
 
 
 def fallback_assignee_options() -> List[str]:
-    return ["Unassigned"]
+    return FALLBACK_ASSIGNEE_OPTIONS
 
 
 def assignee_options_from_agents(agents: List[Dict[str, Any]]) -> List[str]:
@@ -774,22 +1219,28 @@ def assignee_options_from_agents(agents: List[Dict[str, Any]]) -> List[str]:
     return sorted(options, key=str.lower)
 
 
-def match_agent_id_from_directory(assignee: str, agents: List[Dict[str, Any]]) -> Optional[str]:
-    assignee_lower = assignee.strip().lower()
-    if not assignee_lower:
-        return None
-
+def build_agent_directory_index(agents: List[Dict[str, Any]]) -> Dict[str, str]:
+    # setdefault keeps the first agent (in directory order) for each id/name,
+    # matching the first-match semantics of a linear scan.
+    index: Dict[str, str] = {}
     for agent in agents:
         if agent.get("configured") is False:
             continue
         candidate_id = str(agent.get("id", "")).strip()
         if not candidate_id:
             continue
+        index.setdefault(candidate_id.lower(), candidate_id)
         candidate_name = str(agent.get("name") or "").strip()
-        if assignee_lower == candidate_id.lower() or (candidate_name and assignee_lower == candidate_name.lower()):
-            return candidate_id
+        if candidate_name:
+            index.setdefault(candidate_name.lower(), candidate_id)
+    return index
 
-    return None
+
+def match_agent_id_from_directory(assignee: str, index: Dict[str, str]) -> Optional[str]:
+    assignee_lower = assignee.strip().lower()
+    if not assignee_lower:
+        return None
+    return index.get(assignee_lower)
 
 
 async def resolve_assignee_agent_id_from_directory(assignee: str) -> Optional[str]:
@@ -805,7 +1256,7 @@ async def resolve_assignee_agent_id_from_directory(assignee: str) -> Optional[st
     except HTTPException:
         return None
 
-    agent_id = match_agent_id_from_directory(assignee, directory.get("agents", []))
+    agent_id = match_agent_id_from_directory(assignee, directory.get("index", {}))
     if agent_id:
         return agent_id
 
@@ -837,8 +1288,8 @@ def parse_sessions_list_response(response: Dict[str, Any]) -> List[Dict[str, Any
             if not isinstance(text, str):
                 continue
             try:
-                parsed = json.loads(text)
-            except json.JSONDecodeError:
+                parsed = orjson.loads(text)
+            except orjson.JSONDecodeError:
                 continue
             if isinstance(parsed, dict):
                 for key in ("sessions", "items"):
@@ -869,8 +1320,8 @@ def parse_tool_result_details(response: Dict[str, Any]) -> Dict[str, Any]:
             if not isinstance(text, str):
                 continue
             try:
-                parsed = json.loads(text)
-            except json.JSONDecodeError:
+                parsed = orjson.loads(text)
+            except orjson.JSONDecodeError:
                 continue
             if isinstance(parsed, dict):
                 return parsed
@@ -894,31 +1345,102 @@ def parse_sessions_history_result(response: Dict[str, Any]) -> Dict[str, Any]:
     return {"messages": parsed_messages, "status": status, "error": error}
 
 
-def normalize_gateway_timestamp(value: Any) -> Dict[str, Any]:
+def parse_sessions_history_batch_result(response: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    details = parse_tool_result_details(response)
+    histories = details.get("histories")
+    if isinstance(histories, dict):
+        items = [
+            {"sessionKey": key, **value} if isinstance(value, dict) else {"sessionKey": key, "messages": value}
+            for key, value in histories.items()
+        ]
+    elif isinstance(histories, list):
+        items = [item for item in histories if isinstance(item, dict)]
+    else:
+        return {}
+
+    messages_by_key: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        key = str(item.get("sessionKey") or item.get("key") or "").strip()
+        messages = item.get("messages")
+        if key and isinstance(messages, list):
+            messages_by_key[key] = [message for message in messages if isinstance(message, dict)]
+    return messages_by_key
+
+
+async def fetch_sessions_history_batch(session_keys: List[str], history_limit: int) -> Dict[str, List[Dict[str, Any]]]:
+    # One round-trip for every session when the gateway offers the batched
+    # tool. Anything it rejects or leaves out falls back to per-session calls,
+    # and a rejection parks the batch path until the next retry window.
+    if not session_keys or time.monotonic() < sessions_history_batch_state["retry_at"]:
+        return {}
+    try:
+        response = await call_openclaw_tool(
+            "sessions_history_batch",
+            {"sessionKeys": session_keys, "limit": history_limit, "includeTools": True},
+            timeout_seconds=30.0,
+        )
+    except HTTPException:
+        sessions_history_batch_state["retry_at"] = time.monotonic() + SESSIONS_HISTORY_BATCH_RETRY_SECONDS
+        return {}
+    return parse_sessions_history_batch_result(response)
+
+
+def session_updated_timestamp(session: Dict[str, Any]) -> Dict[str, Any]:
+    return normalize_gateway_timestamp(session.get("updatedAt") or session.get("updated_at") or session.get("timestamp"))
+
+
+def cached_session_commands(key: str, history_limit: int, updated_at_ms: int) -> Optional[List[Dict[str, Any]]]:
+    cached = session_commands_cache.get((key, history_limit))
+    if cached is None or not updated_at_ms or cached[0] != updated_at_ms:
+        return None
+    if time.monotonic() - cached[1] >= SESSION_COMMANDS_CACHE_TTL_SECONDS:
+        return None
+    return cached[2]
+
+
+def store_session_commands(key: str, history_limit: int, updated_at_ms: int, commands: List[Dict[str, Any]]) -> None:
+    if not updated_at_ms:
+        return
+    cache_key = (key, history_limit)
+    session_commands_cache.pop(cache_key, None)
+    if len(session_commands_cache) >= SESSION_COMMANDS_CACHE_MAX_ENTRIES:
+        session_commands_cache.pop(next(iter(session_commands_cache)))
+    session_commands_cache[cache_key] = (updated_at_ms, time.monotonic(), commands)
+
+
+# Histories are re-read on every activity poll, so the same raw timestamps
+# come through repeatedly; parse each one once.
+@functools.lru_cache(maxsize=4096)
+def gateway_timestamp_parts(value: Any) -> tuple[Optional[str], Optional[int]]:
     if isinstance(value, (int, float)):
         ts = float(value)
         if ts <= 0:
-            return {"iso": None, "ms": None}
+            return None, None
         ts_ms = int(ts if ts > 1_000_000_000_000 else ts * 1000)
-        dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).isoformat()
-        return {"iso": dt, "ms": ts_ms}
+        return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).isoformat(), ts_ms
 
-    if isinstance(value, str):
-        raw = value.strip()
-        if not raw:
-            return {"iso": None, "ms": None}
-        parsed_dt: Optional[datetime] = None
-        try:
-            parsed_dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
-        except ValueError:
-            parsed_dt = None
-        if parsed_dt is None:
-            return {"iso": raw, "ms": None}
-        if parsed_dt.tzinfo is None:
-            parsed_dt = parsed_dt.replace(tzinfo=timezone.utc)
-        parsed_utc = parsed_dt.astimezone(timezone.utc)
-        return {"iso": parsed_utc.isoformat(), "ms": int(parsed_utc.timestamp() * 1000)}
+    raw = value.strip()
+    if not raw:
+        return None, None
+    try:
+        parsed_dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return raw, None
+    if parsed_dt.tzinfo is None:
+        parsed_dt = parsed_dt.replace(tzinfo=timezone.utc)
+    parsed_utc = parsed_dt.astimezone(timezone.utc)
+    return parsed_utc.isoformat(), int(parsed_utc.timestamp() * 1000)
 
+
+def message_timestamp(message: Dict[str, Any]) -> tuple[Optional[str], Optional[int]]:
+    value = message.get("timestamp")
+    return gateway_timestamp_parts(value) if isinstance(value, (int, float, str)) else (None, None)
+
+
+def normalize_gateway_timestamp(value: Any) -> Dict[str, Any]:
+    if isinstance(value, (int, float, str)):
+        iso, ms = gateway_timestamp_parts(value)
+        return {"iso": iso, "ms": ms}
     return {"iso": None, "ms": None}
 
 
@@ -968,7 +1490,7 @@ def command_input_summary(value: Any) -> Optional[str]:
             return f"action={action.strip()} sessionId={session_id.strip()}"[:500]
         return f"action={action.strip()}"[:500]
 
-    compact = json.dumps(value, ensure_ascii=True, separators=(",", ":"))
+    compact = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
     return compact[:500] if compact else None
 
 
@@ -980,13 +1502,9 @@ def infer_command_result_status(message: Dict[str, Any], preview: Optional[str])
     if "command still running" in text:
         return "running"
 
-    exit_match = re.search(r"exited with code\\s+(-?\\d+)", text)
+    exit_match = EXIT_CODE_PATTERN.search(text)
     if exit_match:
-        try:
-            code = int(exit_match.group(1))
-        except ValueError:
-            code = 1
-        return "success" if code == 0 else "error"
+        return "success" if int(exit_match.group(1)) == 0 else "error"
 
     if "http error" in text or text.startswith("error:") or "traceback" in text:
         return "error"
@@ -1004,18 +1522,14 @@ def infer_agent_id_from_session_key(session_key: str) -> Optional[str]:
     return None
 
 
-def is_monitored_command_tool(name: Any) -> bool:
-    if not isinstance(name, str):
-        return False
+def normalized_name(value: Any) -> str:
+    return value.strip().lower() if isinstance(value, str) else ""
 
-    normalized = name.strip().lower()
-    if not normalized:
-        return False
+
+def is_monitored_command_tool(normalized: str) -> bool:
     if normalized in COMMAND_MONITOR_TOOL_NAMES:
         return True
-
-    tail = normalized.rsplit(".", 1)[-1]
-    return tail in COMMAND_MONITOR_TOOL_NAMES
+    return normalized.rsplit(".", 1)[-1] in COMMAND_MONITOR_TOOL_NAMES
 
 
 def extract_command_runs(messages: List[Dict[str, Any]], max_runs: int = 120) -> List[Dict[str, Any]]:
@@ -1049,20 +1563,16 @@ def extract_command_runs(messages: List[Dict[str, Any]], max_runs: int = 120) ->
 
     for index, message in enumerate(messages):
         role = str(message.get("role") or "")
-        timestamp = normalize_gateway_timestamp(message.get("timestamp"))
-        timestamp_iso = timestamp.get("iso")
-        timestamp_ms = timestamp.get("ms")
-
+        # Timestamps are only parsed for messages that touch a monitored run.
         if role in {"assistant", "tool"}:
             content = message.get("content")
             if isinstance(content, list):
                 for block in content:
                     if not isinstance(block, dict):
                         continue
-                    block_type = str(block.get("type") or "").strip().lower()
-                    if block_type not in COMMAND_MONITOR_TOOL_BLOCK_TYPES:
+                    if normalized_name(block.get("type")) not in COMMAND_MONITOR_TOOL_BLOCK_TYPES:
                         continue
-                    tool_name = str(block.get("name") or block.get("toolName") or "").strip().lower()
+                    tool_name = normalized_name(block.get("name") or block.get("toolName"))
                     if not is_monitored_command_tool(tool_name):
                         continue
 
@@ -1073,6 +1583,7 @@ def extract_command_runs(messages: List[Dict[str, Any]], max_runs: int = 120) ->
                         call_id = f"req-{index}-{synthetic_counter}"
 
                     run = ensure_run(call_id, tool_name, index)
+                    timestamp_iso, timestamp_ms = message_timestamp(message)
                     command_text = command_input_summary(
                         block.get("input") or block.get("arguments") or block.get("args")
                     )
@@ -1090,7 +1601,7 @@ def extract_command_runs(messages: List[Dict[str, Any]], max_runs: int = 120) ->
         if role != "toolResult":
             continue
 
-        tool_name = str(message.get("toolName") or message.get("name") or "").strip().lower()
+        tool_name = normalized_name(message.get("toolName") or message.get("name"))
         if not is_monitored_command_tool(tool_name):
             continue
 
@@ -1101,6 +1612,7 @@ def extract_command_runs(messages: List[Dict[str, Any]], max_runs: int = 120) ->
             call_id = f"result-{index}-{synthetic_counter}"
 
         run = ensure_run(call_id, tool_name, index)
+        timestamp_iso, timestamp_ms = message_timestamp(message)
         preview = content_preview(message.get("content"))
         run["preview"] = preview
         run["status"] = infer_command_result_status(message, preview)
@@ -1116,43 +1628,29 @@ def extract_command_runs(messages: List[Dict[str, Any]], max_runs: int = 120) ->
             if run.get("startedAtMs") is None and timestamp_ms is not None:
                 run["startedAtMs"] = timestamp_ms
 
-    runs: List[Dict[str, Any]] = []
-    for call_id in creation_order:
-        run = runs_by_call_id.get(call_id)
-        if not run:
-            continue
-        runs.append(
-            {
-                "callId": run.get("callId"),
-                "toolName": run.get("toolName"),
-                "status": run.get("status") or "unknown",
-                "command": run.get("command"),
-                "preview": run.get("preview"),
-                "startedAt": run.get("startedAt"),
-                "finishedAt": run.get("finishedAt"),
-                "updatedAt": run.get("updatedAt"),
-                "_updatedAtMs": run.get("updatedAtMs"),
-                "_startedAtMs": run.get("startedAtMs"),
-                "_index": run.get("index"),
-            }
-        )
-
-    runs.sort(
+    # Only the newest max_runs survive, so select them without sorting the rest
+    # (nlargest keeps creation order for ties, like a stable reverse sort).
+    latest_runs = heapq.nlargest(
+        max_runs,
+        (runs_by_call_id[call_id] for call_id in creation_order),
         key=lambda run: (
-            int(run.get("_updatedAtMs") or run.get("_startedAtMs") or 0),
-            int(run.get("_index") or 0),
+            int(run.get("updatedAtMs") or run.get("startedAtMs") or 0),
+            int(run.get("index") or 0),
         ),
-        reverse=True,
     )
-
-    compacted: List[Dict[str, Any]] = []
-    for run in runs[:max_runs]:
-        item = dict(run)
-        item.pop("_updatedAtMs", None)
-        item.pop("_startedAtMs", None)
-        item.pop("_index", None)
-        compacted.append(item)
-    return compacted
+    return [
+        {
+            "callId": run.get("callId"),
+            "toolName": run.get("toolName"),
+            "status": run.get("status") or "unknown",
+            "command": run.get("command"),
+            "preview": run.get("preview"),
+            "startedAt": run.get("startedAt"),
+            "finishedAt": run.get("finishedAt"),
+            "updatedAt": run.get("updatedAt"),
+        }
+        for run in latest_runs
+    ]
 
 
 async def fetch_gateway_sessions_with_fallback(limit: int) -> List[Dict[str, Any]]:
@@ -1162,13 +1660,17 @@ async def fetch_gateway_sessions_with_fallback(limit: int) -> List[Dict[str, Any
         {"limit": limit},
         {},
     ]
-    for args in attempts:
+    # Start from the argument shape the gateway last accepted so older
+    # gateways don't pay for the rejected shapes on every call.
+    start = sessions_list_shape_state["index"]
+    for index in [*range(start, len(attempts)), *range(start)]:
         try:
-            response = await call_openclaw_tool("sessions_list", args, timeout_seconds=20.0)
-            return parse_sessions_list_response(response)
+            response = await call_openclaw_tool("sessions_list", attempts[index], timeout_seconds=20.0)
         except HTTPException as exc:
             last_error = exc
             continue
+        sessions_list_shape_state["index"] = index
+        return parse_sessions_list_response(response)
 
     if last_error is not None:
         raise last_error
@@ -1180,31 +1682,21 @@ def tickets_by_session_key(session_keys: List[str]) -> Dict[str, List[Dict[str,
     if not keys:
         return {}
 
-    placeholders = ",".join(["?"] * len(keys))
-    query = (
-        "SELECT id, title, status, assignee, agent_session_key "
-        "FROM tickets "
-        f"WHERE agent_session_key IN ({placeholders})"
-    )
     mapping: Dict[str, List[Dict[str, Any]]] = {}
     with get_db() as conn:
-        rows = conn.execute(query, keys).fetchall()
-        for row in rows:
-            key = str(row["agent_session_key"] or "").strip()
+        rows = conn.execute(SQL_SELECT_TICKETS_BY_SESSION_KEYS, (orjson.dumps(keys).decode("utf-8"),))
+        for row_id, title, status, assignee, agent_session_key in rows:
+            key = str(agent_session_key or "").strip()
             if not key:
                 continue
             mapping.setdefault(key, []).append(
                 {
-                    "id": int(row["id"]),
-                    "title": str(row["title"] or ""),
-                    "status": str(row["status"] or ""),
-                    "assignee": str(row["assignee"] or ""),
+                    "id": int(row_id),
+                    "title": str(title or ""),
+                    "status": str(status or ""),
+                    "assignee": str(assignee or ""),
                 }
             )
-
-    for key in mapping:
-        mapping[key].sort(key=lambda item: item["id"], reverse=True)
-
     return mapping
 
 
@@ -1257,16 +1749,16 @@ def recent_session_stubs_from_events(limit: int = 800) -> List[Dict[str, Any]]:
     sessions_by_key: Dict[str, Dict[str, Any]] = {}
     with get_db() as conn:
         rows = conn.execute(query, [*event_types, limit]).fetchall()
-        for row in rows:
-            details = str(row["details"] or "")
-            created_at = str(row["created_at"] or "")
-            status = infer_session_status_from_event(str(row["event_type"] or ""))
+        for event_type, raw_details, raw_created_at, ticket_id, ticket_title, ticket_status, ticket_assignee in rows:
+            details = str(raw_details or "")
+            created_at = str(raw_created_at or "")
+            status = infer_session_status_from_event(str(event_type or ""))
 
             ticket_ref = {
-                "id": int(row["ticket_id"]),
-                "title": str(row["ticket_title"] or ""),
-                "status": str(row["ticket_status"] or ""),
-                "assignee": str(row["ticket_assignee"] or ""),
+                "id": int(ticket_id),
+                "title": str(ticket_title or ""),
+                "status": str(ticket_status or ""),
+                "assignee": str(ticket_assignee or ""),
             }
 
             for key in extract_session_keys_from_text(details):
@@ -1296,69 +1788,155 @@ def recent_session_stubs_from_events(limit: int = 800) -> List[Dict[str, Any]]:
     return list(sessions_by_key.values())
 
 
-async def is_session_live(session_key: str) -> Dict[str, Any]:
-    key = session_key.strip()
-    if not key:
-        return {"attempted": False, "live": False, "reason": "Empty session key"}
+async def fetch_live_sessions_uncached() -> Dict[str, Dict[str, Any]]:
+    response = await call_openclaw_tool(
+        "sessions_list",
+        {"limit": 200, "messageLimit": 0},
+        timeout_seconds=20.0,
+    )
+    # Indexed by key once per fetch; the first entry for a key wins.
+    sessions_by_key: Dict[str, Dict[str, Any]] = {}
+    for session in parse_sessions_list_response(response):
+        key = str(session.get("sessionKey") or session.get("key") or session.get("id") or "").strip()
+        sessions_by_key.setdefault(key, session)
+    return sessions_by_key
 
-    try:
-        response = await call_openclaw_tool(
-            "sessions_list",
-            {"limit": 200, "messageLimit": 0},
-            timeout_seconds=20.0,
-        )
-    except HTTPException as exc:
-        return {"attempted": True, "live": False, "reason": str(exc.detail)}
 
-    sessions = parse_sessions_list_response(response)
-    if not sessions:
-        return {"attempted": True, "live": False, "reason": "No sessions returned by gateway"}
+def finish_live_sessions_fetch(task: "asyncio.Task[Dict[str, Dict[str, Any]]]") -> None:
+    if sessions_list_cache["task"] is not task:
+        return
+    if task.cancelled() or task.exception() is not None:
+        sessions_list_cache["task"] = None
+        return
+    sessions_list_cache["expires_at"] = time.monotonic() + SESSIONS_LIST_CACHE_TTL_SECONDS
 
-    for session in sessions:
-        candidate = str(
-            session.get("sessionKey")
-            or session.get("key")
-            or session.get("id")
-            or ""
-        ).strip()
-        if candidate != key:
-            continue
 
-        status = str(session.get("status") or session.get("state") or "").strip().lower()
-        if status in {"", "running", "active", "idle", "queued", "started"}:
-            return {"attempted": True, "live": True, "status": status or "unknown"}
-        return {
-            "attempted": True,
-            "live": False,
-            "reason": f"Session present but not live (status={status})",
-            "status": status,
-        }
+async def fetch_live_sessions() -> Dict[str, Dict[str, Any]]:
+    task = sessions_list_cache["task"]
+    if task is None or (task.done() and time.monotonic() >= sessions_list_cache["expires_at"]):
+        task = asyncio.create_task(fetch_live_sessions_uncached())
+        sessions_list_cache["task"] = task
+        sessions_list_cache["expires_at"] = float("inf")
+        task.add_done_callback(finish_live_sessions_fetch)
+    return await asyncio.shield(task)
 
-    return {"attempted": True, "live": False, "reason": "Session key not found"}
 
+def invalidate_live_sessions() -> None:
+    sessions_list_cache["task"] = None
 
-def build_spawn_prompt(ticket: Dict[str, Any], status: str) -> str:
-    status_instruction = (
-        "Perform planning and analysis only, then move the ticket to Review when planning is complete."
-        if status == "Plan"
-        else "Implement the requested change, then move the ticket to Review when implementation is complete."
-    )
-    return (
-        f"# Ticket #{ticket['id']}: {ticket['title']}\n\n"
-        f"Description:\n{ticket.get('description') or '(none)'}\n\n"
-        f"Priority: {ticket.get('priority', 'Medium')}\n"
-        f"Assignee: {ticket.get('assignee', 'Unassigned')}\n"
-        f"Current Status: {status}\n\n"
-        f"You were assigned this ticket because it moved to {status}.\n"
-        "Read the ticket and existing comments before starting, especially the latest comment.\n"
-        f"{status_instruction}\n"
-        "Report updates by posting comments to the Kanban API.\n"
-        f"POST {API_BASE_URL}/api/tickets/{ticket['id']}/comments with JSON {{\"author\":\"{ticket.get('assignee','Agent')}\",\"content\":\"update\"}}\n"
-        "Keep the response concise and actionable."
-    )
 
+def cached_live_sessions() -> Optional[Dict[str, Dict[str, Any]]]:
+    task = sessions_list_cache["task"]
+    if task is None or not task.done() or time.monotonic() >= sessions_list_cache["expires_at"]:
+        return None
+    return task.result()
 
-async def spawn_agent_for_ticket(ticket: Dict[str, Any], status: str, session_suffix: Optional[str] = None) -> Dict[str, Any]:
+
+async def fetch_session_status(key: str) -> Optional[str]:
+    # Single-key lookup for gateways that expose sessions_get. None means "no
+    # answer" (unsupported tool or unrecognised reply) and the caller falls
+    # back to the shared sessions_list; a rejection parks this path for a while.
+    if time.monotonic() < sessions_get_state["retry_at"]:
+        return None
+    try:
+        response = await call_openclaw_tool("sessions_get", {"sessionKey": key}, timeout_seconds=10.0)
+    except HTTPException:
+        sessions_get_state["retry_at"] = time.monotonic() + SESSIONS_GET_RETRY_SECONDS
+        return None
+
+    details = parse_tool_result_details(response)
+    session = details.get("session") if isinstance(details.get("session"), dict) else details
+    status = session.get("status") or session.get("state")
+    return status.strip().lower() if isinstance(status, str) else None
+
+
+def session_liveness(status: str) -> Dict[str, Any]:
+    if status in LIVE_SESSION_STATUSES:
+        return {"attempted": True, "live": True, "status": status or "unknown"}
+    return {
+        "attempted": True,
+        "live": False,
+        "reason": f"Session present but not live (status={status})",
+        "status": status,
+    }
+
+
+async def is_session_live(session_key: str) -> Dict[str, Any]:
+    key = session_key.strip()
+    if not key:
+        return {"attempted": False, "live": False, "reason": "Empty session key"}
+
+    # A warm sessions_list snapshot answers for free; otherwise ask the gateway
+    # about this one key before pulling the whole list.
+    sessions_by_key = cached_live_sessions()
+    if sessions_by_key is None:
+        status = await fetch_session_status(key)
+        if status is not None:
+            return session_liveness(status)
+        try:
+            sessions_by_key = await fetch_live_sessions()
+        except HTTPException as exc:
+            return {"attempted": True, "live": False, "reason": str(exc.detail)}
+
+    if not sessions_by_key:
+        return {"attempted": True, "live": False, "reason": "No sessions returned by gateway"}
+
+    session = sessions_by_key.get(key)
+    if session is None:
+        return {"attempted": True, "live": False, "reason": "Session key not found"}
+    return session_liveness(str(session.get("status") or session.get("state") or "").strip().lower())
+
+
+SPAWN_PROMPT_TEMPLATE = (
+    "# Ticket #{id}: {title}\n\n"
+    "Description:\n{description}\n\n"
+    "Priority: {priority}\n"
+    "Assignee: {assignee}\n"
+    "Current Status: {status}\n\n"
+    "You were assigned this ticket because it moved to {status}.\n"
+    "Read the ticket and existing comments before starting, especially the latest comment.\n"
+    "{status_instruction}\n"
+    "Report updates by posting comments to the Kanban API.\n"
+    "POST {api_base_url}/api/tickets/{id}/comments with JSON {{\"author\":\"{author}\",\"content\":\"update\"}}\n"
+    "Keep the response concise and actionable."
+)
+SPAWN_PROMPT_PLAN_TEMPLATE = SPAWN_PROMPT_TEMPLATE.replace(
+    "{status_instruction}",
+    "Perform planning and analysis only, then move the ticket to Review when planning is complete.",
+)
+SPAWN_PROMPT_IMPLEMENT_TEMPLATE = SPAWN_PROMPT_TEMPLATE.replace(
+    "{status_instruction}",
+    "Implement the requested change, then move the ticket to Review when implementation is complete.",
+)
+COMMENT_FOLLOWUP_PROMPT_TEMPLATE = (
+    "Ticket #{id} received a new comment.\n\n"
+    "Title: {title}\n"
+    "Status: {status}\n"
+    "Author: {author}\n\n"
+    "New comment:\n"
+    "{content}\n\n"
+    "Read ticket details and latest comments before responding. "
+    "Post a concise update comment if action is needed."
+)
+
+
+def build_spawn_prompt(ticket: Dict[str, Any], status: str) -> str:
+    template = SPAWN_PROMPT_PLAN_TEMPLATE if status == "Plan" else SPAWN_PROMPT_IMPLEMENT_TEMPLATE
+    return template.format_map(
+        {
+            "id": ticket["id"],
+            "title": ticket["title"],
+            "description": ticket.get("description") or "(none)",
+            "priority": ticket.get("priority", "Medium"),
+            "assignee": ticket.get("assignee", "Unassigned"),
+            "author": ticket.get("assignee", "Agent"),
+            "status": status,
+            "api_base_url": API_BASE_URL,
+        }
+    )
+
+
+async def spawn_agent_for_ticket(ticket: Dict[str, Any], status: str, session_suffix: Optional[str] = None) -> Dict[str, Any]:
     assignee = (ticket.get("assignee") or "").strip()
     if not OPENCLAW_TOKEN:
         return {"attempted": False, "spawned": False, "reason": "OPENCLAW_TOKEN is not configured"}
@@ -1394,6 +1972,10 @@ async def spawn_agent_for_ticket(ticket: Dict[str, Any], status: str, session_su
             "spawned": False,
             "reason": str(exc.detail),
         }
+    finally:
+        # The gateway's session list has changed (or may have); don't let the
+        # next liveness check answer from a snapshot taken before this send.
+        invalidate_live_sessions()
 
     return {
         "attempted": True,
@@ -1423,6 +2005,70 @@ async def ensure_agent_session(ticket: Dict[str, Any], status: str, force_new: b
     return spawn
 
 
+def load_ticket(ticket_id: int) -> Optional[Dict[str, Any]]:
+    with get_db() as conn:
+        row = conn.execute(SQL_SELECT_TICKET_BY_ID, (ticket_id,)).fetchone()
+    return ticket_row(row) if row else None
+
+
+def record_ticket_pickup(
+    ticket: Dict[str, Any],
+    target_status: str,
+    actor: str,
+    session_result: Dict[str, Any],
+) -> tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    ticket_id = ticket["id"]
+    comments_to_broadcast: List[Dict[str, Any]] = []
+    events_to_broadcast: List[Dict[str, Any]] = []
+    updated_ticket: Optional[Dict[str, Any]] = None
+    with get_db() as conn:
+        begin_write(conn)
+        if session_result.get("reused"):
+            reuse_event = create_event(
+                conn,
+                ticket_id,
+                "agent_reused",
+                actor,
+                f"Reused existing session {session_result.get('session_key')} on status {target_status}",
+            )
+            events_to_broadcast.append(reuse_event)
+        elif session_result.get("spawned"):
+            session_key = session_result.get("session_key")
+            updated_ticket = update_ticket_returning(
+                conn, ticket_id, "agent_session_key = ?, updated_at = ?", (session_key, now_iso())
+            )
+            spawn_event = create_event(
+                conn,
+                ticket_id,
+                "agent_spawned",
+                actor,
+                f"Assignee {ticket['assignee']} mapped to {session_result.get('agent_id')} session={session_key} on status {target_status}",
+            )
+            comment = create_comment(
+                conn,
+                ticket_id,
+                "System",
+                f"Agent pickup started for **{ticket['assignee']}** on **{target_status}**. Session: `{session_key}`",
+            )
+            comments_to_broadcast.append(comment)
+            events_to_broadcast.append(spawn_event)
+        else:
+            reason = session_result.get("reason", "unknown")
+            failure_event = create_event(conn, ticket_id, "agent_spawn_failed", actor, reason)
+            comment = create_comment(conn, ticket_id, "System", f"Agent pickup failed: {reason}")
+            comments_to_broadcast.append(comment)
+            events_to_broadcast.append(failure_event)
+
+        commit_write(conn)
+        # Reuse and failure paths leave the row untouched; re-read it for them.
+        if updated_ticket is None:
+            final_row = conn.execute(SQL_SELECT_TICKET_BY_ID, (ticket_id,)).fetchone()
+            if final_row:
+                updated_ticket = ticket_row(final_row)
+
+    return updated_ticket, events_to_broadcast, comments_to_broadcast
+
+
 async def process_ticket_pickup_async(
     ticket_id: int,
     target_status: str,
@@ -1430,86 +2076,42 @@ async def process_ticket_pickup_async(
     force_new_session: bool = False,
 ) -> None:
     try:
-        comments_to_broadcast: List[Dict[str, Any]] = []
-        events_to_broadcast: List[Dict[str, Any]] = []
-        updated_ticket: Optional[Dict[str, Any]] = None
-        with get_db() as conn:
-            row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
-            if not row:
-                return
-
-            ticket = row_to_dict(row)
-            if ticket.get("archived_at"):
-                return
-            if ticket.get("status") != target_status:
-                return
-            if target_status not in AUTOMATION_TRIGGER_STATUSES:
-                return
-
-            session_result = await ensure_agent_session(ticket, target_status, force_new=force_new_session)
-            if session_result.get("reused"):
-                reuse_event = create_event(
-                    conn,
-                    ticket_id,
-                    "agent_reused",
-                    actor,
-                    f"Reused existing session {session_result.get('session_key')} on status {target_status}",
-                )
-                events_to_broadcast.append(reuse_event)
-            elif session_result.get("spawned"):
-                session_key = session_result.get("session_key")
-                execute_write(
-                    conn,
-                    "UPDATE tickets SET agent_session_key = ?, updated_at = ? WHERE id = ?",
-                    (session_key, now_iso(), ticket_id),
-                )
-                spawn_event = create_event(
-                    conn,
-                    ticket_id,
-                    "agent_spawned",
-                    actor,
-                    f"Assignee {ticket['assignee']} mapped to {session_result.get('agent_id')} session={session_key} on status {target_status}",
-                )
-                comment = create_comment(
-                    conn,
-                    ticket_id,
-                    "System",
-                    f"Agent pickup started for **{ticket['assignee']}** on **{target_status}**. Session: `{session_key}`",
-                )
-                comments_to_broadcast.append(comment)
-                events_to_broadcast.append(spawn_event)
-            else:
-                reason = session_result.get("reason", "unknown")
-                failure_event = create_event(conn, ticket_id, "agent_spawn_failed", actor, reason)
-                comment = create_comment(conn, ticket_id, "System", f"Agent pickup failed: {reason}")
-                comments_to_broadcast.append(comment)
-                events_to_broadcast.append(failure_event)
-
-            commit_write(conn)
-            final_row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
-            if final_row:
-                updated_ticket = row_to_dict(final_row)
+        ticket = await asyncio.to_thread(load_ticket, ticket_id)
+        if ticket is None:
+            return
+        if ticket.get("archived_at"):
+            return
+        if ticket.get("status") != target_status:
+            return
+        if target_status not in AUTOMATION_TRIGGER_STATUSES:
+            return
+
+        session_result = await ensure_agent_session(ticket, target_status, force_new=force_new_session)
+        updated_ticket, events_to_broadcast, comments_to_broadcast = await run_db_write(
+            lambda: record_ticket_pickup(ticket, target_status, actor, session_result)
+        )
 
+        messages: List[Dict[str, Any]] = []
         if updated_ticket is not None:
-            await manager.broadcast({"type": "ticket_updated", "ticket": updated_ticket})
-        for event in events_to_broadcast:
-            await manager.broadcast({"type": "ticket_event", "event": event})
-        for comment in comments_to_broadcast:
-            await manager.broadcast({"type": "comment_added", "ticket_id": ticket_id, "comment": comment})
+            messages.append({"type": "ticket_updated", "ticket": updated_ticket})
+        messages.extend({"type": "ticket_event", "event": event} for event in events_to_broadcast)
+        messages.extend(
+            {"type": "comment_added", "ticket_id": ticket_id, "comment": comment} for comment in comments_to_broadcast
+        )
+        await manager.broadcast_many(messages)
     except Exception as exc:
         print(f"process_ticket_pickup_async failed for ticket {ticket_id}: {exc}")
 
 
 def build_comment_followup_prompt(ticket: Dict[str, Any], comment: Dict[str, Any]) -> str:
-    return (
-        f"Ticket #{ticket['id']} received a new comment.\n\n"
-        f"Title: {ticket.get('title') or '(untitled)'}\n"
-        f"Status: {ticket.get('status') or '(unknown)'}\n"
-        f"Author: {comment.get('author') or 'Unknown'}\n\n"
-        "New comment:\n"
-        f"{comment.get('content') or '(empty)'}\n\n"
-        "Read ticket details and latest comments before responding. "
-        "Post a concise update comment if action is needed."
+    return COMMENT_FOLLOWUP_PROMPT_TEMPLATE.format_map(
+        {
+            "id": ticket["id"],
+            "title": ticket.get("title") or "(untitled)",
+            "status": ticket.get("status") or "(unknown)",
+            "author": comment.get("author") or "Unknown",
+            "content": comment.get("content") or "(empty)",
+        }
     )
 
 
@@ -1586,12 +2188,13 @@ async def notify_agent_on_comment(ticket: Dict[str, Any], comment: Dict[str, Any
 
 
 def validate_transition(current_status: str, target_status: str) -> None:
-    if target_status not in STATUSES:
+    target_index = STATUS_INDEX.get(target_status)
+    if target_index is None:
         raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(STATUSES)}")
     if target_status == current_status:
         return
-    allowed = ALLOWED_TRANSITIONS.get(current_status, set())
-    if target_status not in allowed:
+    current_index = STATUS_INDEX.get(current_status)
+    if current_index is None or not (TRANSITION_MASKS[current_index] >> target_index) & 1:
         raise HTTPException(
             status_code=400,
             detail=f"invalid transition from '{current_status}' to '{target_status}'",
@@ -1601,13 +2204,44 @@ def validate_transition(current_status: str, target_status: str) -> None:
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    db_pool.fill()
+    load_frontend_index()
 
 
-@app.get("/")
-def index() -> Any:
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    client = gateway_http["client"]
+    if client is not None:
+        gateway_http["client"] = None
+        await client.aclose()
+    db_pool.close_all()
+
+
+# index.html only changes with a new frontend build (i.e. a redeploy), so it is
+# read once at startup and revalidated by ETag instead of stat'ed per request.
+frontend_index: Dict[str, Any] = {"body": None, "etag": None}
+
+
+def load_frontend_index() -> None:
     index_file = FRONTEND_DIST_DIR / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
+    try:
+        body = index_file.read_bytes()
+    except OSError:
+        frontend_index["body"] = None
+        frontend_index["etag"] = None
+        return
+    frontend_index["body"] = body
+    frontend_index["etag"] = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+@app.get("/")
+def index(request: Request) -> Any:
+    body = frontend_index["body"]
+    if body is not None:
+        headers = {"ETag": frontend_index["etag"], "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == frontend_index["etag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="text/html", headers=headers)
     return {
         "ok": False,
         "detail": "frontend build not found. Run `npm run build` in frontend/.",
@@ -1624,7 +2258,7 @@ async def get_config() -> Dict[str, Any]:
     assignee_options = fallback_assignee_options()
     try:
         directory = await get_cached_gateway_agents(force_refresh=False)
-        gateway_options = assignee_options_from_agents(directory.get("agents", []))
+        gateway_options = directory["assignees"]
         if len(gateway_options) > 1:
             assignee_options = gateway_options
     except HTTPException:
@@ -1659,31 +2293,57 @@ async def list_agents(force_refresh: bool = False) -> Dict[str, Any]:
         "cacheTtlSeconds": AGENT_CACHE_TTL_SECONDS,
         "cached": bool(directory.get("cached")),
         "stale": bool(directory.get("stale")),
-        "fetchedAt": datetime.fromtimestamp(float(fetched_at), tz=timezone.utc).isoformat() if fetched_at else None,
-        "expiresAt": datetime.fromtimestamp(float(expires_at), tz=timezone.utc).isoformat() if expires_at else None,
+        "fetchedAt": iso_utc(float(fetched_at)) if fetched_at else None,
+        "expiresAt": iso_utc(float(expires_at)) if expires_at else None,
     }
 
 
+@app.post("/api/agents/cache/clear")
+async def clear_agent_cache() -> Dict[str, Any]:
+    # Detach any in-flight refresh rather than cancelling it, so requests
+    # already awaiting it still get an answer.
+    agent_cache["refresh_task"] = None
+    agent_cache["agents"] = None
+    agent_cache["index"] = {}
+    agent_cache["assignees"] = None
+    agent_cache["fetched_at"] = 0.0
+    agent_cache["expires_at"] = 0.0
+    return {"ok": True}
+
+
 @app.get("/api/gateway/health")
 async def gateway_health() -> Dict[str, Any]:
     if not OPENCLAW_TOKEN:
         return {"ok": False, "gateway": "disabled", "detail": "OPENCLAW_TOKEN is not configured"}
 
+    # Probe both tools at once: some gateways restrict sessions_* tools by
+    # policy and older ones may not expose agents_list. Either succeeding means
+    # the gateway is reachable, so the first success wins.
+    agents_probe = asyncio.create_task(call_openclaw_tool("agents_list", {}, timeout_seconds=10.0))
+    sessions_probe = asyncio.create_task(
+        call_openclaw_tool("sessions_list", {"limit": 1, "messageLimit": 0}, timeout_seconds=10.0)
+    )
+    pending = {agents_probe, sessions_probe}
     try:
-        # Prefer agents_list because some gateways restrict sessions_* tools by policy.
-        await call_openclaw_tool("agents_list", {}, timeout_seconds=10.0)
-        return {"ok": True, "gateway": "reachable"}
-    except HTTPException as agents_exc:
-        try:
-            # Backward compatibility for environments that may not expose agents_list.
-            await call_openclaw_tool("sessions_list", {"limit": 1, "messageLimit": 0}, timeout_seconds=10.0)
-            return {"ok": True, "gateway": "reachable"}
-        except HTTPException as sessions_exc:
-            return {
-                "ok": False,
-                "gateway": "unreachable",
-                "detail": f"agents_list failed: {agents_exc.detail}; sessions_list failed: {sessions_exc.detail}",
-            }
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for probe in done:
+                exc = probe.exception()
+                if exc is None:
+                    return {"ok": True, "gateway": "reachable"}
+                if not isinstance(exc, HTTPException):
+                    raise exc
+    finally:
+        for probe in pending:
+            probe.cancel()
+
+    agents_exc = agents_probe.exception()
+    sessions_exc = sessions_probe.exception()
+    return {
+        "ok": False,
+        "gateway": "unreachable",
+        "detail": f"agents_list failed: {agents_exc.detail}; sessions_list failed: {sessions_exc.detail}",
+    }
 
 
 @app.get("/api/gateway/sessions/activity")
@@ -1693,6 +2353,30 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
     if history_limit < 1 or history_limit > 500:
         raise HTTPException(status_code=400, detail="history_limit must be between 1 and 500")
 
+    # Every open board polls this after each broadcast, so concurrent callers
+    # share one in-flight build and its result for a few seconds.
+    cache_key = (session_limit, history_limit)
+    cached = sessions_activity_cache.get(cache_key)
+    if cached is None or (cached[1].done() and time.monotonic() >= cached[0]):
+        task = asyncio.create_task(build_gateway_sessions_activity(session_limit, history_limit))
+        sessions_activity_cache[cache_key] = (float("inf"), task)
+        task.add_done_callback(lambda done, key=cache_key: finish_sessions_activity_build(key, done))
+    else:
+        task = cached[1]
+    return await asyncio.shield(task)
+
+
+def finish_sessions_activity_build(cache_key: tuple[int, int], task: "asyncio.Task[Dict[str, Any]]") -> None:
+    cached = sessions_activity_cache.get(cache_key)
+    if cached is None or cached[1] is not task:
+        return
+    if task.cancelled() or task.exception() is not None:
+        sessions_activity_cache.pop(cache_key, None)
+        return
+    sessions_activity_cache[cache_key] = (time.monotonic() + SESSIONS_ACTIVITY_CACHE_TTL_SECONDS, task)
+
+
+async def build_gateway_sessions_activity(session_limit: int, history_limit: int) -> Dict[str, Any]:
     generated_at = now_iso()
     gateway_error: Optional[str] = None
     sessions: List[Dict[str, Any]] = []
@@ -1704,7 +2388,7 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
         except HTTPException as exc:
             gateway_error = str(exc.detail)
 
-    recent_stubs = recent_session_stubs_from_events(limit=max(session_limit * 6, 400))
+    recent_stubs = await asyncio.to_thread(recent_session_stubs_from_events, max(session_limit * 6, 400))
     merged_sessions: List[Dict[str, Any]] = []
     seen_session_keys: Set[str] = set()
     for session in [*sessions, *recent_stubs]:
@@ -1736,7 +2420,7 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
         key = str(session.get("key") or session.get("sessionKey") or session.get("id") or "").strip()
         if key:
             session_keys.append(key)
-    ticket_map = tickets_by_session_key(session_keys)
+    ticket_map = await asyncio.to_thread(tickets_by_session_key, session_keys)
     for session in sessions:
         key = str(session.get("key") or session.get("sessionKey") or session.get("id") or "").strip()
         if not key or key in ticket_map:
@@ -1764,6 +2448,15 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
         if normalized_refs:
             ticket_map[key] = normalized_refs
 
+    reusable_commands: Dict[str, List[Dict[str, Any]]] = {}
+    for session in sessions:
+        key = str(session.get("key") or session.get("sessionKey") or session.get("id") or "").strip()
+        commands = cached_session_commands(key, history_limit, int(session_updated_timestamp(session).get("ms") or 0))
+        if commands is not None:
+            reusable_commands[key] = commands
+    prefetched_history = await fetch_sessions_history_batch(
+        [key for key in session_keys if key not in reusable_commands], history_limit
+    )
     semaphore = asyncio.Semaphore(6)
 
     def sessions_history_contexts(session_key: str, agent_id: Optional[str]) -> List[Optional[str]]:
@@ -1791,7 +2484,7 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
 
         return ordered
 
-    async def build_session_activity(session: Dict[str, Any], index: int) -> Dict[str, Any]:
+    async def build_session_activity(session: Dict[str, Any], index: int) -> tuple[int, int, int, Dict[str, Any]]:
         key = str(session.get("key") or session.get("sessionKey") or session.get("id") or "").strip()
         status = str(session.get("status") or session.get("state") or "unknown").strip().lower() or "unknown"
         kind = str(session.get("kind") or "").strip() or None
@@ -1805,8 +2498,7 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
             if isinstance(delivery_channel, str) and delivery_channel.strip():
                 channel = delivery_channel.strip()
 
-        updated_raw = session.get("updatedAt") or session.get("updated_at") or session.get("timestamp")
-        updated_ts = normalize_gateway_timestamp(updated_raw)
+        updated_ts = session_updated_timestamp(session)
         updated_at = updated_ts.get("iso")
         updated_at_ms = int(updated_ts.get("ms") or 0)
 
@@ -1816,7 +2508,12 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
         commands: List[Dict[str, Any]] = []
         history_error: Optional[str] = None
 
-        if key:
+        if key in reusable_commands:
+            commands = reusable_commands[key]
+        elif key in prefetched_history:
+            commands = extract_command_runs(prefetched_history[key])
+            store_session_commands(key, history_limit, updated_at_ms, commands)
+        elif key:
             history_messages: List[Dict[str, Any]] = []
             history_errors: List[str] = []
             history_success = False
@@ -1859,6 +2556,8 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
                         break
                 if unique_errors:
                     history_error = "; ".join(unique_errors)[:500]
+            if history_success:
+                store_session_commands(key, history_limit, updated_at_ms, commands)
 
         running_count = sum(1 for item in commands if str(item.get("status")) == "running")
         error_count = sum(1 for item in commands if str(item.get("status")) == "error")
@@ -1878,7 +2577,7 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
         if last_command_at_ms >= updated_at_ms and last_command_ts.get("iso"):
             activity_at = str(last_command_ts.get("iso"))
 
-        return {
+        row = {
             "key": key,
             "status": status,
             "kind": kind,
@@ -1898,25 +2597,13 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
             "historyError": history_error,
             "tickets": ticket_map.get(key, []),
             "commands": commands,
-            "_updatedAtMs": updated_at_ms,
-            "_activityAtMs": activity_at_ms,
-            "_index": index,
         }
+        # Sort keys ride alongside the row instead of inside it.
+        return activity_at_ms, updated_at_ms, -index, row
 
-    session_rows = await asyncio.gather(*[build_session_activity(session, idx) for idx, session in enumerate(sessions)])
-    session_rows.sort(
-        key=lambda row: (
-            int(row.get("_activityAtMs") or 0),
-            int(row.get("_updatedAtMs") or 0),
-            -int(row.get("_index") or 0),
-        ),
-        reverse=True,
-    )
-    session_rows = session_rows[:session_limit]
-    for row in session_rows:
-        row.pop("_updatedAtMs", None)
-        row.pop("_activityAtMs", None)
-        row.pop("_index", None)
+    ranked_rows = await asyncio.gather(*[build_session_activity(session, idx) for idx, session in enumerate(sessions)])
+    ranked_rows.sort(key=lambda ranked: ranked[:3], reverse=True)
+    session_rows = [ranked[3] for ranked in ranked_rows[:session_limit]]
 
     response: Dict[str, Any] = {
         "ok": gateway_error is None,
@@ -1928,159 +2615,307 @@ async def gateway_sessions_activity(session_limit: int = 200, history_limit: int
     return response
 
 
+def encode_activity_cursor(created_at: str, event_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([created_at, event_id])).decode("ascii")
+
+
+def decode_activity_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        created_at, event_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="invalid activity cursor") from exc
+    if not isinstance(created_at, str) or not isinstance(event_id, int):
+        raise HTTPException(status_code=400, detail="invalid activity cursor")
+    return created_at, event_id
+
+
+# The handful of filter combinations each map to one fixed SQL string, built
+# once; identical strings also hit the connection's prepared-statement cache.
+@functools.lru_cache(maxsize=None)
+def activity_query(
+    include_archived: bool, by_ticket: bool, by_event_type: bool, after_cursor: bool, with_offset: bool
+) -> str:
+    query = (
+        "SELECT "
+        "e.id, e.ticket_id, e.event_type, e.actor, e.details, e.created_at, "
+        "t.title AS ticket_title, t.status AS ticket_status, t.assignee AS ticket_assignee, "
+        "t.priority AS ticket_priority, t.archived_at AS ticket_archived_at "
+        # CROSS JOIN pins ticket_events as the outer loop so the feed walks its
+        # time index and stops at LIMIT. Left to itself the planner starts
+        # from the archived_at index on tickets and sorts every live event.
+        "FROM ticket_events e "
+        "CROSS JOIN tickets t ON t.id = e.ticket_id "
+        "WHERE 1=1"
+    )
+    if not include_archived:
+        query += " AND t.archived_at IS NULL"
+    if by_ticket:
+        query += " AND e.ticket_id = ?"
+    if by_event_type:
+        query += " AND e.event_type = ?"
+    if after_cursor:
+        # Keyset pagination: seek past the last row of the previous page
+        # instead of scanning and discarding OFFSET rows.
+        query += " AND (e.created_at, e.id) < (?, ?)"
+    query += " ORDER BY e.created_at DESC, e.id DESC LIMIT ?"
+    if with_offset:
+        query += " OFFSET ?"
+    return query
+
+
 @app.get("/api/activity")
 def list_activity(
     limit: int = 250,
     offset: int = 0,
+    cursor: Optional[str] = None,
     ticket_id: Optional[int] = None,
     event_type: Optional[str] = None,
     include_archived: bool = False,
-) -> List[Dict[str, Any]]:
+) -> ORJSONResponse:
     if limit < 1 or limit > 1000:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
     if offset < 0:
         raise HTTPException(status_code=400, detail="offset must be >= 0")
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="use either cursor or offset, not both")
+
+    params: List[Any] = []
+    if ticket_id is not None:
+        params.append(ticket_id)
+    if event_type:
+        params.append(event_type)
+    if cursor:
+        params.extend(decode_activity_cursor(cursor))
+    # One extra row tells us whether another page exists without a COUNT(*).
+    params.append(limit + 1)
+    if offset:
+        params.append(offset)
+    query = activity_query(include_archived, ticket_id is not None, bool(event_type), bool(cursor), bool(offset))
 
     with get_db() as conn:
-        query = (
-            "SELECT "
-            "e.id, e.ticket_id, e.event_type, e.actor, e.details, e.created_at, "
-            "t.title AS ticket_title, t.status AS ticket_status, t.assignee AS ticket_assignee, "
-            "t.priority AS ticket_priority, t.archived_at AS ticket_archived_at "
-            "FROM ticket_events e "
-            "JOIN tickets t ON t.id = e.ticket_id "
-            "WHERE 1=1"
-        )
-        params: List[Any] = []
+        items = cursor_dicts(conn.execute(query, params))
 
-        if not include_archived:
-            query += " AND t.archived_at IS NULL"
-        if ticket_id is not None:
-            query += " AND e.ticket_id = ?"
-            params.append(ticket_id)
-        if event_type:
-            query += " AND e.event_type = ?"
-            params.append(event_type)
+    has_more = len(items) > limit
+    headers = {"X-Has-More": "true" if has_more else "false"}
+    if has_more:
+        del items[limit:]
+        headers["X-Next-Cursor"] = encode_activity_cursor(items[-1]["created_at"], items[-1]["id"])
+    return ORJSONResponse(items, headers=headers)
 
-        query += " ORDER BY e.created_at DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
 
-        rows = conn.execute(query, params).fetchall()
-        return [row_to_dict(r) for r in rows]
+def ensure_workspace_root() -> None:
+    now = time.monotonic()
+    if now < workspace_root_state["verified_until"]:
+        return
+    if not WORKSPACE_ROOT.is_dir():
+        raise HTTPException(status_code=500, detail=f"Workspace root is unavailable: {WORKSPACE_ROOT}")
+    workspace_root_state["verified_until"] = now + WORKSPACE_ROOT_CHECK_TTL_SECONDS
 
 
 @app.get("/api/workspace/list")
-def list_workspace(path: str = "", include_hidden: bool = False) -> Dict[str, Any]:
-    if not WORKSPACE_ROOT.exists() or not WORKSPACE_ROOT.is_dir():
-        raise HTTPException(status_code=500, detail=f"Workspace root is unavailable: {WORKSPACE_ROOT}")
+def list_workspace(path: str = "", include_hidden: bool = False) -> ORJSONResponse:
+    ensure_workspace_root()
 
     directory, resolved_root = resolve_workspace_path_for_read(path, expected_kind="dir")
 
+    rel_path = workspace_relative(directory, root=resolved_root) if directory != resolved_root else ""
+
     entries: List[Dict[str, Any]] = []
     try:
-        for child in directory.iterdir():
-            name = child.name
-            if not include_hidden and name.startswith("."):
-                continue
-            if child.is_dir() and name in WORKSPACE_SKIP_DIRS:
-                continue
-            entries.append(workspace_entry(child, root=resolved_root))
+        with os.scandir(directory) as iterator:
+            for child in iterator:
+                name = child.name
+                if not include_hidden and name.startswith("."):
+                    continue
+                if name in WORKSPACE_SKIP_DIRS and child.is_dir():
+                    continue
+                entries.append(workspace_entry(child, rel_path))
     except PermissionError as exc:
         raise HTTPException(status_code=403, detail=f"Permission denied: {exc}") from exc
     except OSError as exc:
         raise HTTPException(status_code=500, detail=f"Failed to list directory: {exc}") from exc
 
     entries.sort(key=lambda item: (item["type"] != "dir", item["name"].lower()))
-    rel_path = workspace_relative(directory, root=resolved_root) if directory != resolved_root else ""
 
-    return {
+    return ORJSONResponse({
         "root": str(resolved_root),
         "path": rel_path,
         "entries": entries,
-    }
+    })
+
+
+def read_workspace_text(file_path: Path, stats: os.stat_result) -> str:
+    cache_key = (str(file_path), stats.st_ino, stats.st_mtime_ns, stats.st_size)
+    content = workspace_text_cache.get(cache_key)
+    if content is not None:
+        return content
+
+    content = file_path.read_text(encoding="utf-8")
+    if (
+        len(workspace_text_cache) >= WORKSPACE_TEXT_CACHE_MAX_ENTRIES
+        or workspace_text_cache_state["bytes"] + stats.st_size > WORKSPACE_TEXT_CACHE_MAX_BYTES
+    ):
+        workspace_text_cache.clear()
+        workspace_text_cache_state["bytes"] = 0
+    workspace_text_cache[cache_key] = content
+    workspace_text_cache_state["bytes"] += stats.st_size
+    return content
 
 
 @app.get("/api/workspace/file")
-def read_workspace_file(path: str) -> Dict[str, Any]:
-    if not WORKSPACE_ROOT.exists() or not WORKSPACE_ROOT.is_dir():
-        raise HTTPException(status_code=500, detail=f"Workspace root is unavailable: {WORKSPACE_ROOT}")
+def read_workspace_file(path: str) -> WorkspaceFileContent:
+    ensure_workspace_root()
 
     file_path, resolved_root = resolve_workspace_path_for_read(path, expected_kind="file")
 
-    stats = file_path.stat()
+    try:
+        stats = file_path.stat()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="path not found") from exc
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to read file: {exc}") from exc
     if stats.st_size > WORKSPACE_MAX_FILE_BYTES:
         raise HTTPException(
             status_code=413,
             detail=f"file too large ({stats.st_size} bytes). Max is {WORKSPACE_MAX_FILE_BYTES} bytes",
         )
 
-    is_image = is_image_file(file_path)
+    suffix = file_path.suffix.lower()
+    is_image = suffix in WORKSPACE_IMAGE_SUFFIXES
     content = ""
     if not is_image:
         try:
-            content = file_path.read_text(encoding="utf-8")
+            content = read_workspace_text(file_path, stats)
         except UnicodeDecodeError as exc:
             raise HTTPException(status_code=415, detail="file is not UTF-8 text") from exc
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail="path not found") from exc
         except PermissionError as exc:
             raise HTTPException(status_code=403, detail=f"Permission denied: {exc}") from exc
         except OSError as exc:
             raise HTTPException(status_code=500, detail=f"Failed to read file: {exc}") from exc
 
-    return {
-        "root": str(resolved_root),
-        "path": workspace_relative(file_path, root=resolved_root),
-        "name": file_path.name,
-        "content": content,
-        "isMarkdown": is_markdown_file(file_path),
-        "isImage": is_image,
-        "sizeBytes": stats.st_size,
-        "updatedAt": datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc).isoformat(),
-    }
+    return WorkspaceFileContent(
+        root=str(resolved_root),
+        path=workspace_relative(file_path, root=resolved_root),
+        name=file_path.name,
+        content=content,
+        isMarkdown=suffix in WORKSPACE_MARKDOWN_SUFFIXES,
+        isImage=is_image,
+        sizeBytes=stats.st_size,
+        updatedAt=iso_utc(stats.st_mtime),
+    )
 
 
 @app.get("/api/workspace/content")
-def read_workspace_content(path: str) -> FileResponse:
-    if not WORKSPACE_ROOT.exists() or not WORKSPACE_ROOT.is_dir():
-        raise HTTPException(status_code=500, detail=f"Workspace root is unavailable: {WORKSPACE_ROOT}")
+def read_workspace_content(path: str, request: Request) -> Response:
+    ensure_workspace_root()
 
     file_path, _ = resolve_workspace_path_for_read(path, expected_kind="file")
     if not is_image_file(file_path):
         raise HTTPException(status_code=415, detail="workspace content preview only supports image files")
 
-    return FileResponse(path=file_path)
+    # Hand the stat result over so FileResponse skips its own stat call; the
+    # body is streamed by Starlette (zero-copy when the server supports the
+    # http.response.zerocopy extension).
+    try:
+        stats = file_path.stat()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="path not found") from exc
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to read file: {exc}") from exc
+    # The preview URL doesn't change when an image is overwritten, so browsers
+    # revalidate every time and get a bodiless 304 while the ETag (derived
+    # from mtime and size) still matches.
+    response = FileResponse(path=file_path, stat_result=stats, headers={"Cache-Control": "no-cache"})
+    if request.headers.get("if-none-match") == response.headers["etag"]:
+        return Response(
+            status_code=304,
+            headers={name: response.headers[name] for name in ("etag", "last-modified", "cache-control")},
+        )
+    return response
 
 
-def write_workspace_file_content(file_path: Path, content: str) -> None:
-    parent = file_path.parent
-    temp_path: Optional[Path] = None
+@app.get("/api/workspace/file/raw")
+def read_workspace_file_raw(path: str) -> FileResponse:
+    ensure_workspace_root()
+
+    file_path, _ = resolve_workspace_path_for_read(path, expected_kind="file")
     try:
-        with tempfile.NamedTemporaryFile(
-            mode="w",
-            encoding="utf-8",
-            dir=str(parent),
-            prefix=f".{file_path.name}.",
-            suffix=".tmp",
-            delete=False,
-        ) as temp_file:
-            temp_file.write(content)
-            temp_path = Path(temp_file.name)
-        os.replace(temp_path, file_path)
+        stats = file_path.stat()
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="path not found") from exc
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to read file: {exc}") from exc
+
+    # Streamed from disk in chunks by Starlette, so unlike /api/workspace/file
+    # there is no size cap; the viewer links here when that endpoint says 413.
+    # The media type is guessed from the name, and the sandbox CSP keeps any
+    # HTML an agent wrote from running scripts on the app's origin.
+    return FileResponse(
+        path=file_path,
+        stat_result=stats,
+        headers={"X-Content-Type-Options": "nosniff", "Content-Security-Policy": "sandbox"},
+    )
+
+
+# Returns the written file's stat, taken from the open handle after the last
+# write, so callers don't stat the path again. os.replace keeps it valid.
+def write_workspace_file_content(
+    file_path: Path, content: str, payload_size: int, atomic: bool = False
+) -> os.stat_result:
+    if not atomic and payload_size <= WORKSPACE_DIRECT_WRITE_MAX_BYTES:
+        try:
+            with open(file_path, "w", encoding="utf-8", newline="") as handle:
+                handle.write(content)
+                handle.flush()
+                stats = os.fstat(handle.fileno())
+        except PermissionError as exc:
+            raise HTTPException(status_code=403, detail=f"Permission denied: {exc}") from exc
+        except OSError as exc:
+            raise HTTPException(status_code=500, detail=f"Failed to write file: {exc}") from exc
+        return stats
+
+    temp_name: Optional[str] = None
+    try:
+        fd, temp_name = tempfile.mkstemp(dir=str(file_path.parent), prefix=f".{file_path.name}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as temp_file:
+            # Encode in slices so the bytes never hold a second full copy of the file.
+            for start in range(0, len(content), WORKSPACE_WRITE_CHUNK_CHARS):
+                temp_file.write(content[start : start + WORKSPACE_WRITE_CHUNK_CHARS].encode("utf-8"))
+            temp_file.flush()
+            stats = os.fstat(temp_file.fileno())
+        os.replace(temp_name, file_path)
+        temp_name = None
     except PermissionError as exc:
         raise HTTPException(status_code=403, detail=f"Permission denied: {exc}") from exc
     except OSError as exc:
         raise HTTPException(status_code=500, detail=f"Failed to write file: {exc}") from exc
     finally:
-        if temp_path is not None and temp_path.exists():
+        if temp_name is not None:
             try:
-                temp_path.unlink()
+                os.unlink(temp_name)
             except OSError:
                 pass
+    return stats
+
+
+def workspace_file_written(file_path: Path, stats: os.stat_result) -> WorkspaceFileWritten:
+    suffix = file_path.suffix.lower()
+    return WorkspaceFileWritten(
+        root=str(WORKSPACE_ROOT),
+        path=workspace_relative(file_path),
+        name=file_path.name,
+        isMarkdown=suffix in WORKSPACE_MARKDOWN_SUFFIXES,
+        isImage=suffix in WORKSPACE_IMAGE_SUFFIXES,
+        sizeBytes=stats.st_size,
+        updatedAt=iso_utc(stats.st_mtime),
+    )
 
 
 @app.post("/api/workspace/file")
-def create_workspace_file(create: WorkspaceFileCreate) -> Dict[str, Any]:
-    if not WORKSPACE_ROOT.exists() or not WORKSPACE_ROOT.is_dir():
-        raise HTTPException(status_code=500, detail=f"Workspace root is unavailable: {WORKSPACE_ROOT}")
+def create_workspace_file(create: WorkspaceFileCreate, atomic: bool = False) -> WorkspaceFileWritten:
+    ensure_workspace_root()
 
     file_path = resolve_workspace_path(create.path)
     if file_path.exists():
@@ -2097,25 +2932,15 @@ def create_workspace_file(create: WorkspaceFileCreate) -> Dict[str, Any]:
             detail=f"content too large ({payload_size} bytes). Max is {WORKSPACE_MAX_FILE_BYTES} bytes",
         )
 
-    write_workspace_file_content(file_path, create.content)
+    stats = write_workspace_file_content(file_path, create.content, payload_size, atomic=atomic)
+    workspace_resolve_cache.clear()
 
-    stats = file_path.stat()
-    return {
-        "ok": True,
-        "root": str(WORKSPACE_ROOT),
-        "path": workspace_relative(file_path),
-        "name": file_path.name,
-        "isMarkdown": is_markdown_file(file_path),
-        "isImage": is_image_file(file_path),
-        "sizeBytes": stats.st_size,
-        "updatedAt": datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc).isoformat(),
-    }
+    return workspace_file_written(file_path, stats)
 
 
 @app.put("/api/workspace/file")
-def update_workspace_file(update: WorkspaceFileUpdate) -> Dict[str, Any]:
-    if not WORKSPACE_ROOT.exists() or not WORKSPACE_ROOT.is_dir():
-        raise HTTPException(status_code=500, detail=f"Workspace root is unavailable: {WORKSPACE_ROOT}")
+def update_workspace_file(update: WorkspaceFileUpdate, atomic: bool = False) -> WorkspaceFileWritten:
+    ensure_workspace_root()
 
     file_path = resolve_workspace_path(update.path)
     if file_path.exists() and not file_path.is_file():
@@ -2132,25 +2957,15 @@ def update_workspace_file(update: WorkspaceFileUpdate) -> Dict[str, Any]:
             detail=f"content too large ({payload_size} bytes). Max is {WORKSPACE_MAX_FILE_BYTES} bytes",
         )
 
-    write_workspace_file_content(file_path, update.content)
+    stats = write_workspace_file_content(file_path, update.content, payload_size, atomic=atomic)
+    workspace_resolve_cache.clear()
 
-    stats = file_path.stat()
-    return {
-        "ok": True,
-        "root": str(WORKSPACE_ROOT),
-        "path": workspace_relative(file_path),
-        "name": file_path.name,
-        "isMarkdown": is_markdown_file(file_path),
-        "isImage": is_image_file(file_path),
-        "sizeBytes": stats.st_size,
-        "updatedAt": datetime.fromtimestamp(stats.st_mtime, tz=timezone.utc).isoformat(),
-    }
+    return workspace_file_written(file_path, stats)
 
 
 @app.delete("/api/workspace/file")
 def delete_workspace_file(path: str) -> Dict[str, Any]:
-    if not WORKSPACE_ROOT.exists() or not WORKSPACE_ROOT.is_dir():
-        raise HTTPException(status_code=500, detail=f"Workspace root is unavailable: {WORKSPACE_ROOT}")
+    ensure_workspace_root()
 
     target_path = resolve_workspace_path(path)
     if target_path == WORKSPACE_ROOT:
@@ -2169,6 +2984,8 @@ def delete_workspace_file(path: str) -> Dict[str, Any]:
         raise HTTPException(status_code=403, detail=f"Permission denied: {exc}") from exc
     except OSError as exc:
         raise HTTPException(status_code=500, detail=f"Failed to delete path: {exc}") from exc
+    finally:
+        workspace_resolve_cache.clear()
 
     parent_path = workspace_relative(target_path.parent) if target_path.parent != WORKSPACE_ROOT else ""
     return {
@@ -2179,64 +2996,65 @@ def delete_workspace_file(path: str) -> Dict[str, Any]:
     }
 
 
+@functools.lru_cache(maxsize=None)
+def ticket_list_query(archived: bool, by_status: bool, by_assignee: bool) -> str:
+    query = f"SELECT {TICKET_COLUMNS} FROM tickets WHERE 1=1"
+    if archived:
+        query += " AND archived_at IS NOT NULL"
+    else:
+        query += " AND archived_at IS NULL"
+    if by_status:
+        query += " AND status = ?"
+    if by_assignee:
+        query += " AND assignee = ?"
+    if archived:
+        query += " ORDER BY archived_at DESC, updated_at DESC"
+    else:
+        query += " ORDER BY priority_rank, updated_at DESC"
+    return query
+
+
 @app.get("/api/tickets")
 def list_tickets(
     status: Optional[str] = None,
     assignee: Optional[str] = None,
     archived: bool = False,
-) -> List[Dict[str, Any]]:
-    with get_db() as conn:
-        query = "SELECT * FROM tickets WHERE 1=1"
-        params: List[Any] = []
+) -> ORJSONResponse:
+    params: List[Any] = []
+    if status:
+        params.append(status)
+    if assignee:
+        params.append(assignee)
+    query = ticket_list_query(archived, bool(status), bool(assignee))
 
-        if archived:
-            query += " AND archived_at IS NOT NULL"
-        else:
-            query += " AND archived_at IS NULL"
-
-        if status:
-            query += " AND status = ?"
-            params.append(status)
-        if assignee:
-            query += " AND assignee = ?"
-            params.append(assignee)
-
-        if archived:
-            query += " ORDER BY archived_at DESC, updated_at DESC"
-        else:
-            query += (
-                " ORDER BY "
-                "CASE priority WHEN 'Critical' THEN 1 WHEN 'High' THEN 2 WHEN 'Medium' THEN 3 ELSE 4 END, "
-                "updated_at DESC"
-            )
-
-        rows = conn.execute(query, params).fetchall()
-        return [row_to_dict(r) for r in rows]
+    with get_db() as conn:
+        return ORJSONResponse(list(map(ticket_row, conn.execute(query, params))))
 
 
 @app.get("/api/tickets/{ticket_id}")
 def get_ticket(ticket_id: int) -> Dict[str, Any]:
     with get_db() as conn:
-        row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        row = conn.execute(SQL_SELECT_TICKET_BY_ID, (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
-        return row_to_dict(row)
+        return ticket_row(row)
 
 
 @app.get("/api/tickets/{ticket_id}/docs")
-def get_ticket_docs(ticket_id: int) -> Dict[str, Any]:
+def get_ticket_docs(ticket_id: int) -> ORJSONResponse:
     with get_db() as conn:
         row = conn.execute("SELECT id, title FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
-        ticket = row_to_dict(row)
+        title = row[1]
 
-    folder = find_task_docs_dir(ticket_id, preferred_title=ticket["title"])
-    expected_folder = default_task_docs_dir(ticket_id, ticket["title"])
+    folder = find_task_docs_dir(ticket_id, preferred_title=title)
+    expected_folder = default_task_docs_dir(ticket_id, title)
     files: List[Dict[str, Any]] = []
-    exists = bool(folder and folder.exists() and folder.is_dir())
+    # find_task_docs_dir only returns directories it has just checked.
+    exists = folder is not None
 
-    if exists and folder is not None:
+    if folder is not None:
         try:
             files = list_task_docs_files(folder)
         except ValueError as exc:
@@ -2245,49 +3063,54 @@ def get_ticket_docs(ticket_id: int) -> Dict[str, Any]:
             raise HTTPException(status_code=500, detail=f"Failed to list task docs: {exc}") from exc
 
     folder_for_response = folder if folder is not None else expected_folder
-    return {
+    return ORJSONResponse({
         "ticketId": ticket_id,
         "folderPath": workspace_relative_or_string(folder_for_response),
         "exists": exists,
         "files": files,
-    }
+    })
 
 
-@app.post("/api/tickets")
-async def create_ticket(ticket: TicketCreate) -> Dict[str, Any]:
+def insert_ticket(ticket: TicketCreate) -> tuple[Dict[str, Any], Dict[str, Any]]:
     ts = now_iso()
 
     with get_db() as conn:
-        cursor = execute_write(
+        begin_write(conn)
+        rows = execute_write(
             conn,
-            """
-            INSERT INTO tickets (title, description, status, assignee, priority, archived_at, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+            SQL_INSERT_TICKET,
             (ticket.title, ticket.description, "Todo", ticket.assignee, ticket.priority, None, ts, ts),
-        )
-        ticket_id = cursor.lastrowid
+        ).fetchall()
+        created = ticket_row(rows[0])
 
-        event = create_event(conn, ticket_id, "ticket_created", "User", f"Created ticket: {ticket.title}")
+        event = create_event(conn, created["id"], "ticket_created", "User", f"Created ticket: {ticket.title}")
         commit_write(conn)
 
-        row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
-        created = row_to_dict(row)
+    return created, event
 
-    await manager.broadcast({"type": "ticket_created", "ticket": created})
-    await manager.broadcast({"type": "ticket_event", "event": event})
+
+@app.post("/api/tickets")
+async def create_ticket(ticket: TicketCreate) -> Dict[str, Any]:
+    created, event = await run_db_write(lambda: insert_ticket(ticket))
+
+    await manager.broadcast_many([
+        {"type": "ticket_created", "ticket": created},
+        {"type": "ticket_event", "event": event},
+    ])
     return created
 
 
-@app.patch("/api/tickets/{ticket_id}")
-async def update_ticket(ticket_id: int, update: TicketUpdate) -> Dict[str, Any]:
+def apply_ticket_update(
+    ticket_id: int, update: TicketUpdate
+) -> tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
     docs_move_event: Optional[Dict[str, Any]] = None
     with get_db() as conn:
-        row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        begin_write(conn)
+        row = conn.execute(SQL_SELECT_TICKET_BY_ID, (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
 
-        current = row_to_dict(row)
+        current = ticket_row(row)
         fields: List[str] = []
         params: List[Any] = []
         change_summary: List[str] = []
@@ -2297,9 +3120,12 @@ async def update_ticket(ticket_id: int, update: TicketUpdate) -> Dict[str, Any]:
         title_changed = update.title is not None and update.title != current["title"]
 
         if title_changed:
+            # find_task_docs_dir has just checked source_dir is a directory,
+            # and the target sits next to it, so neither needs another stat.
+            # A title change that keeps the slug ends at the path comparison.
             source_dir = find_task_docs_dir(ticket_id, preferred_title=current["title"])
 
-            if source_dir and source_dir.is_dir():
+            if source_dir is not None:
                 target_dir = expected_task_docs_dir_for_root(source_dir.parent, ticket_id, new_title)
                 if source_dir != target_dir:
                     if target_dir.exists():
@@ -2307,7 +3133,6 @@ async def update_ticket(ticket_id: int, update: TicketUpdate) -> Dict[str, Any]:
                             status_code=409,
                             detail=f"Target docs folder already exists: {workspace_relative_or_string(target_dir)}",
                         )
-                    target_dir.parent.mkdir(parents=True, exist_ok=True)
                     try:
                         source_dir.rename(target_dir)
                     except OSError as exc:
@@ -2325,132 +3150,166 @@ async def update_ticket(ticket_id: int, update: TicketUpdate) -> Dict[str, Any]:
                 change_summary.append(f"{name}: {current[name]} -> {new_value}")
 
         if not fields:
-            return current
+            return current, None, None
 
         fields.append("updated_at = ?")
         params.append(now_iso())
-        params.append(ticket_id)
 
-        execute_write(conn, f"UPDATE tickets SET {', '.join(fields)} WHERE id = ?", tuple(params))
-        event = create_event(conn, ticket_id, "ticket_updated", "User", "; ".join(change_summary))
+        updated = update_ticket_returning(conn, ticket_id, ", ".join(fields), tuple(params))
+        event_rows = [(ticket_id, "ticket_updated", "User", "; ".join(change_summary))]
         if docs_move_details:
-            docs_move_event = create_event(
-                conn,
-                ticket_id,
-                "ticket_docs_moved",
-                "User",
-                f"{docs_move_details['from']} -> {docs_move_details['to']}",
+            event_rows.append(
+                (
+                    ticket_id,
+                    "ticket_docs_moved",
+                    "User",
+                    f"{docs_move_details['from']} -> {docs_move_details['to']}",
+                )
             )
+        event, *extra_events = create_events(conn, event_rows)
+        if extra_events:
+            docs_move_event = extra_events[0]
         commit_write(conn)
 
-        updated = row_to_dict(conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone())
+    return updated, event, docs_move_event
+
+
+@app.patch("/api/tickets/{ticket_id}")
+async def update_ticket(ticket_id: int, update: TicketUpdate) -> Dict[str, Any]:
+    if not update.model_dump(exclude_none=True):
+        # An empty PATCH changes nothing; answer with a plain read instead of
+        # queueing on the writer thread and taking the write lock.
+        current = await asyncio.to_thread(load_ticket, ticket_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="ticket not found")
+        return current
+
+    updated, event, docs_move_event = await run_db_write(lambda: apply_ticket_update(ticket_id, update))
+    if event is None:
+        return updated
 
-    await manager.broadcast({"type": "ticket_updated", "ticket": updated})
-    await manager.broadcast({"type": "ticket_event", "event": event})
+    messages = [
+        {"type": "ticket_updated", "ticket": updated},
+        {"type": "ticket_event", "event": event},
+    ]
     if docs_move_event is not None:
-        await manager.broadcast({"type": "ticket_event", "event": docs_move_event})
+        messages.append({"type": "ticket_event", "event": docs_move_event})
+    await manager.broadcast_many(messages)
     return updated
 
 
-@app.post("/api/tickets/{ticket_id}/archive")
-async def archive_ticket(ticket_id: int, actor: str = "User") -> Dict[str, Any]:
+def archive_ticket_record(ticket_id: int, actor: str) -> tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
     with get_db() as conn:
-        row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        begin_write(conn)
+        row = conn.execute(SQL_SELECT_TICKET_BY_ID, (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
 
-        current = row_to_dict(row)
+        current = ticket_row(row)
         if current.get("archived_at"):
-            return current
+            return current, None
 
         ts = now_iso()
-        execute_write(
-            conn,
-            "UPDATE tickets SET archived_at = ?, updated_at = ? WHERE id = ?",
-            (ts, ts, ticket_id),
-        )
+        archived_ticket = update_ticket_returning(conn, ticket_id, "archived_at = ?, updated_at = ?", (ts, ts))
         event = create_event(conn, ticket_id, "ticket_archived", actor, f"Archived from {current['status']}")
         commit_write(conn)
 
-        archived_ticket = row_to_dict(conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone())
+    return archived_ticket, event
+
 
-    await manager.broadcast({"type": "ticket_archived", "ticket": archived_ticket})
-    await manager.broadcast({"type": "ticket_updated", "ticket": archived_ticket})
-    await manager.broadcast({"type": "ticket_event", "event": event})
+@app.post("/api/tickets/{ticket_id}/archive")
+async def archive_ticket(ticket_id: int, actor: str = "User") -> Dict[str, Any]:
+    archived_ticket, event = await run_db_write(lambda: archive_ticket_record(ticket_id, actor))
+    if event is None:
+        return archived_ticket
+
+    await manager.broadcast_many([
+        {"type": "ticket_archived", "ticket": archived_ticket},
+        {"type": "ticket_updated", "ticket": archived_ticket},
+        {"type": "ticket_event", "event": event},
+    ])
     return archived_ticket
 
 
-@app.post("/api/tickets/{ticket_id}/move")
-async def move_ticket(ticket_id: int, status: str, actor: str = "User") -> Dict[str, Any]:
-    warnings: List[str] = []
-    events_to_broadcast: List[Dict[str, Any]] = []
-    pickup: Dict[str, Any] = {"attempted": False, "spawned": False}
-    should_schedule_pickup = False
-    force_new_session = False
-
+def move_ticket_record(
+    ticket_id: int, status: str, actor: str
+) -> tuple[Dict[str, Any], str, Dict[str, Any], List[Dict[str, Any]]]:
     with get_db() as conn:
-        row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        begin_write(conn)
+        row = conn.execute(SQL_SELECT_TICKET_BY_ID, (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
 
-        current = row_to_dict(row)
+        current = ticket_row(row)
         if current.get("archived_at"):
             raise HTTPException(status_code=400, detail="cannot move archived ticket")
         old_status = current["status"]
         validate_transition(old_status, status)
 
+        event_rows = [(ticket_id, "ticket_moved", actor, f"{old_status} -> {status}")]
+        final_ticket = current
+
         if old_status != status:
-            execute_write(
-                conn,
-                "UPDATE tickets SET status = ?, updated_at = ? WHERE id = ?",
-                (status, now_iso(), ticket_id),
-            )
+            previous_session_key = str(current.get("agent_session_key") or "").strip()
+            if (
+                old_status in AUTOMATION_TRIGGER_STATUSES
+                and status not in AUTOMATION_TRIGGER_STATUSES
+                and previous_session_key
+            ):
+                # Leaving automation clears the routing session in the same
+                # UPDATE as the status change.
+                final_ticket = update_ticket_returning(
+                    conn,
+                    ticket_id,
+                    "status = ?, agent_session_key = NULL, updated_at = ?",
+                    (status, now_iso()),
+                )
+                event_rows.append(
+                    (
+                        ticket_id,
+                        "agent_session_deactivated",
+                        actor,
+                        f"Cleared active routing session {previous_session_key} after move {old_status} -> {status}",
+                    )
+                )
+            else:
+                final_ticket = update_ticket_returning(conn, ticket_id, "status = ?, updated_at = ?", (status, now_iso()))
 
-        move_event = create_event(conn, ticket_id, "ticket_moved", actor, f"{old_status} -> {status}")
+        move_event, *extra_events = create_events(conn, event_rows)
+        commit_write(conn)
 
-        updated = row_to_dict(conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone())
+    return final_ticket, old_status, move_event, extra_events
 
-        if old_status != status and status in AUTOMATION_TRIGGER_STATUSES:
-            # Re-opened work (e.g. Review -> In Progress) should start in a fresh
-            # ticket session to avoid stale context from previous runs.
-            force_new_session = old_status not in AUTOMATION_TRIGGER_STATUSES
-            should_schedule_pickup = True
-            pickup = {"attempted": True, "spawned": False, "scheduled": True}
 
-        if (
-            old_status != status
-            and old_status in AUTOMATION_TRIGGER_STATUSES
-            and status not in AUTOMATION_TRIGGER_STATUSES
-            and str(updated.get("agent_session_key") or "").strip()
-        ):
-            previous_session_key = str(updated.get("agent_session_key") or "").strip()
-            execute_write(
-                conn,
-                "UPDATE tickets SET agent_session_key = NULL, updated_at = ? WHERE id = ?",
-                (now_iso(), ticket_id),
-            )
-            deactivate_event = create_event(
-                conn,
-                ticket_id,
-                "agent_session_deactivated",
-                actor,
-                f"Cleared active routing session {previous_session_key} after move {old_status} -> {status}",
-            )
-            events_to_broadcast.append(deactivate_event)
+@app.post("/api/tickets/{ticket_id}/move")
+async def move_ticket(ticket_id: int, status: str, actor: str = "User") -> Dict[str, Any]:
+    warnings: List[str] = []
+    pickup: Dict[str, Any] = {"attempted": False, "spawned": False}
+    should_schedule_pickup = False
+    force_new_session = False
 
-        commit_write(conn)
-        final_ticket = row_to_dict(conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone())
+    final_ticket, old_status, move_event, events_to_broadcast = await run_db_write(
+        lambda: move_ticket_record(ticket_id, status, actor)
+    )
 
-    await manager.broadcast({
-        "type": "ticket_moved",
-        "ticket": final_ticket,
-        "from": old_status,
-        "to": status,
-    })
-    await manager.broadcast({"type": "ticket_updated", "ticket": final_ticket})
-    await manager.broadcast({"type": "ticket_event", "event": move_event})
-    for event in events_to_broadcast:
-        await manager.broadcast({"type": "ticket_event", "event": event})
+    if old_status != status and status in AUTOMATION_TRIGGER_STATUSES:
+        # Re-opened work (e.g. Review -> In Progress) should start in a fresh
+        # ticket session to avoid stale context from previous runs.
+        force_new_session = old_status not in AUTOMATION_TRIGGER_STATUSES
+        should_schedule_pickup = True
+        pickup = {"attempted": True, "spawned": False, "scheduled": True}
+
+    await manager.broadcast_many([
+        {
+            "type": "ticket_moved",
+            "ticket": final_ticket,
+            "from": old_status,
+            "to": status,
+        },
+        {"type": "ticket_updated", "ticket": final_ticket},
+        {"type": "ticket_event", "event": move_event},
+        *({"type": "ticket_event", "event": event} for event in events_to_broadcast),
+    ])
 
     if should_schedule_pickup:
         asyncio.create_task(
@@ -2473,91 +3332,112 @@ async def move_ticket(ticket_id: int, status: str, actor: str = "User") -> Dict[
 
 
 @app.get("/api/tickets/{ticket_id}/comments")
-def get_ticket_comments(ticket_id: int) -> List[Dict[str, Any]]:
+def get_ticket_comments(ticket_id: int) -> ORJSONResponse:
     with get_db() as conn:
-        row = conn.execute("SELECT id FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        row = conn.execute(SQL_TICKET_EXISTS, (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
 
-        rows = conn.execute(
-            "SELECT * FROM ticket_comments WHERE ticket_id = ? ORDER BY created_at ASC",
-            (ticket_id,),
-        ).fetchall()
-        return [row_to_dict(r) for r in rows]
+        rows = conn.execute(SQL_SELECT_COMMENTS_BY_TICKET, (ticket_id,))
+        return ORJSONResponse(list(map(comment_row, rows)))
 
 
-@app.post("/api/tickets/{ticket_id}/comments")
-async def add_ticket_comment(ticket_id: int, comment: CommentCreate) -> Dict[str, Any]:
-    current_ticket: Optional[Dict[str, Any]] = None
+def insert_ticket_comment(
+    ticket_id: int, comment: CommentCreate
+) -> tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
     with get_db() as conn:
-        row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        begin_write(conn)
+        row = conn.execute(SQL_SELECT_TICKET_BY_ID, (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
 
-        current_ticket = row_to_dict(row)
+        current_ticket = ticket_row(row)
         created = create_comment(conn, ticket_id, comment.author, comment.content)
         event = create_event(conn, ticket_id, "comment_added", comment.author, comment.content[:300])
         commit_write(conn)
 
-    followup_event: Optional[Dict[str, Any]] = None
-    respawn_event: Optional[Dict[str, Any]] = None
-    if current_ticket is not None:
-        notify_result = await notify_agent_on_comment(current_ticket, created)
-        if notify_result.get("attempted"):
-            with get_db() as conn:
-                if notify_result.get("respawned") and notify_result.get("session_key"):
-                    execute_write(
-                        conn,
-                        "UPDATE tickets SET agent_session_key = ?, updated_at = ? WHERE id = ?",
-                        (notify_result.get("session_key"), now_iso(), ticket_id),
-                    )
-                    respawn_event = create_event(
-                        conn,
-                        ticket_id,
-                        "agent_respawned_after_notify_failure",
-                        "System",
-                        f"Replaced session {notify_result.get('previous_session_key')} with {notify_result.get('session_key')}",
-                    )
+    return current_ticket, created, event
 
-                if notify_result.get("notified"):
-                    followup_event = create_event(
-                        conn,
-                        ticket_id,
-                        "agent_notified",
-                        "System",
-                        f"Forwarded comment to session {notify_result.get('session_key')}",
-                    )
-                else:
-                    followup_event = create_event(
-                        conn,
-                        ticket_id,
-                        "agent_notify_failed",
-                        "System",
-                        str(notify_result.get("reason") or "Unknown notification failure"),
-                    )
-                commit_write(conn)
-
-    await manager.broadcast({"type": "comment_added", "ticket_id": ticket_id, "comment": created})
-    await manager.broadcast({"type": "ticket_event", "event": event})
-    if respawn_event is not None:
-        await manager.broadcast({"type": "ticket_event", "event": respawn_event})
-    if followup_event is not None:
-        await manager.broadcast({"type": "ticket_event", "event": followup_event})
+
+def record_comment_notification(ticket_id: int, notify_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    with get_db() as conn:
+        begin_write(conn)
+        event_rows: List[tuple[int, str, str, str]] = []
+        if notify_result.get("respawned") and notify_result.get("session_key"):
+            execute_write(
+                conn,
+                "UPDATE tickets SET agent_session_key = ?, updated_at = ? WHERE id = ?",
+                (notify_result.get("session_key"), now_iso(), ticket_id),
+            )
+            event_rows.append(
+                (
+                    ticket_id,
+                    "agent_respawned_after_notify_failure",
+                    "System",
+                    f"Replaced session {notify_result.get('previous_session_key')} with {notify_result.get('session_key')}",
+                )
+            )
+
+        if notify_result.get("notified"):
+            event_rows.append(
+                (
+                    ticket_id,
+                    "agent_notified",
+                    "System",
+                    f"Forwarded comment to session {notify_result.get('session_key')}",
+                )
+            )
+        else:
+            event_rows.append(
+                (
+                    ticket_id,
+                    "agent_notify_failed",
+                    "System",
+                    str(notify_result.get("reason") or "Unknown notification failure"),
+                )
+            )
+        notify_events = create_events(conn, event_rows)
+        commit_write(conn)
+
+    return notify_events
+
+
+async def process_comment_notify_async(ticket: Dict[str, Any], comment: Dict[str, Any]) -> None:
+    ticket_id = ticket["id"]
+    try:
+        notify_result = await notify_agent_on_comment(ticket, comment)
+        if not notify_result.get("attempted"):
+            return
+        notify_events = await run_db_write(lambda: record_comment_notification(ticket_id, notify_result))
+        await manager.broadcast_many([{"type": "ticket_event", "event": event} for event in notify_events])
+    except Exception as exc:
+        print(f"process_comment_notify_async failed for ticket {ticket_id}: {exc}")
+
+
+@app.post("/api/tickets/{ticket_id}/comments")
+async def add_ticket_comment(ticket_id: int, comment: CommentCreate) -> Dict[str, Any]:
+    current_ticket, created, event = await run_db_write(lambda: insert_ticket_comment(ticket_id, comment))
+
+    await manager.broadcast_many([
+        {"type": "comment_added", "ticket_id": ticket_id, "comment": created},
+        {"type": "ticket_event", "event": event},
+    ])
+
+    # Forwarding the comment to the agent session is a gateway round-trip (and
+    # possibly a respawn); do it after responding, like ticket pickup.
+    asyncio.create_task(process_comment_notify_async(current_ticket, created))
     return created
 
 
 @app.get("/api/tickets/{ticket_id}/events")
-def get_ticket_events(ticket_id: int) -> List[Dict[str, Any]]:
+def get_ticket_events(ticket_id: int) -> ORJSONResponse:
     with get_db() as conn:
-        row = conn.execute("SELECT id FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        row = conn.execute(SQL_TICKET_EXISTS, (ticket_id,)).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="ticket not found")
 
-        rows = conn.execute(
-            "SELECT * FROM ticket_events WHERE ticket_id = ? ORDER BY created_at DESC",
-            (ticket_id,),
-        ).fetchall()
-        return [row_to_dict(r) for r in rows]
+        rows = conn.execute(SQL_SELECT_EVENTS_BY_TICKET, (ticket_id,))
+        return ORJSONResponse(list(map(event_row, rows)))
 
 
 @app.websocket("/ws")
@@ -2567,8 +3447,11 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
         while True:
             data = await websocket.receive_text()
             if data == "ping":
-                await websocket.send_text("pong")
+                # Goes through the outbox so it never interleaves with the writer task.
+                manager.send(websocket, "pong")
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 
@@ -116,6 +116,14 @@ export function WorkspacePage({ searchValue, refreshToken, notify }: WorkspacePa
     const query = new URLSearchParams({ path: selectedFile.path })
     return buildApiUrl(`/api/workspace/content?${query.toString()}`)
   }, [selectedFile])
+  // Files over the editor's size cap are still viewable, streamed as-is.
+  const selectedRawFileUrl = useMemo(() => {
+    if (!selectedFilePath || fileQuery.error?.status !== 413) {
+      return ''
+    }
+    const query = new URLSearchParams({ path: selectedFilePath })
+    return buildApiUrl(`/api/workspace/file/raw?${query.toString()}`)
+  }, [fileQuery.error, selectedFilePath])
 
   useEffect(() => {
     const rootData = rootQuery.data
@@ -947,6 +955,14 @@ export function WorkspacePage({ searchValue, refreshToken, notify }: WorkspacePa
             {selectedFilePath && fileQuery.uiError ? (
               <p className="workspace-file-state">
                 <strong>{fileQuery.uiError.title}:</strong> {fileQuery.uiError.message}
+                {selectedRawFileUrl ? (
+                  <>
+                    {' '}
+                    <a href={selectedRawFileUrl} target="_blank" rel="noreferrer">
+                      Open raw file
+                    </a>
+                  </>
+                ) : null}
               </p>
             ) : null}
 